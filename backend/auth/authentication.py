@@ -1,17 +1,41 @@
+import asyncio
+import hashlib
 import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Depends, HTTPException, status # type: ignore
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm # type: ignore
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session # type: ignore
+from pydantic import ValidationError
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from sqlalchemy.orm import Session, selectinload
 
 from core.config import settings
 from models.models import User as DBUser
 from database import get_db
-from auth.schemas import Token, TokenData, UserSchema as AuthUserSchema
+from auth.schemas import Principal, Token, TokenData, UserSchema as AuthUserSchema
+from services import principal_versions
+from utils.ttl_cache import TTLCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min = max = default rounds: hashes made with another cost factor are rehashed at the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+# bcrypt runs on its own threads (it releases the GIL) so a burst of logins doesn't block the event loop
+_password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+# running + waiting password jobs, above that the request is rejected at once instead of queueing
+_password_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE)
+# (sub, token id) -> (Principal, user version): a cached token is authenticated without any DB query,
+# as long as the shared version of the user (services/principal_versions.py) has not moved
+_principal_cache = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
 oauth2_schem = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -24,26 +48,119 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+def create_user_access_token(user: DBUser, expires_delta: timedelta = None):
+    # the claims describe the principal, the DB is only asked to confirm the token version once per token
+    return create_access_token(
+        data={
+            "sub": user.username,
+            "uid": user.id,
+            "disabled": bool(user.disabled),
+            "tv": user.token_version or 0,
+            "jti": uuid.uuid4().hex,
+        },
+        expires_delta=expires_delta,
+    )
+
+async def _run_password_job(func, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        job = _password_executor.submit(func, *args)
+    except BaseException:
+        _password_slots.release()
+        raise
+    # released when the thread is done, even if the request was cancelled meanwhile
+    job.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(job)
+
+async def verify_password(plain_password: str, hashed_password: str):
+    """
+    Renvoie (valide, nouveau hash) : le nouveau hash est à enregistrer quand le coût bcrypt configuré a changé.
+    """
+    return await _run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash(password: str):
+    return await _run_password_job(pwd_context.hash, password)
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+def user_state_etag(user_id: int, version: int, *variant) -> str:
+    # strong ETag of a view of the user's liked/seen/applied state, `variant` distinguishes pages / kinds
+    return '"' + "-".join(str(part) for part in (f"u{user_id}", f"v{version}", *variant)) + '"'
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(DBUser).filter(DBUser.username == username).first()
+# the user's liked/seen/applied jobs, needed by the schemas that list them (no lazy loading in async sessions)
+USER_JOBS_OPTIONS = (
+    selectinload(DBUser.liked_jobs),
+    selectinload(DBUser.seen_jobs),
+    selectinload(DBUser.applied_jobs),
+)
 
-async def authenticate_user(db: Session, username: str, password: str):
-    user = get_user_by_username(db, username)
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(DBUser).where(DBUser.username == username))
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_password(password, user.hashed_password)
+    if not verified:
         return False
-    # Return the DBUser object directly or a dict representing it
-    return AuthUserSchema.from_orm(user)
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
+    # the DBUser itself: the token claims need its id and token version
+    return user
+
+def revoke_user_tokens(user: DBUser) -> None:
+    """
+    Invalide tous les tokens déjà émis pour cet utilisateur (à l'enregistrement du changement).
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+def invalidate_principal(username: str) -> None:
+    _principal_cache.pop_matching(lambda key: key[0] == username)
+
+# usernames changed by the session, their versions are bumped once the change is committed
+PRINCIPAL_CHANGES = "principal_changes"
 
+@event.listens_for(DBUser, "after_update")
+def _invalidate_updated_user(mapper, connection, target):
+    # password reset, disable, profile change...: the next request checks the user in the DB again
+    state = inspect(target)
+    usernames = {target.username, *state.attrs.username.history.deleted}
+    for username in usernames:
+        invalidate_principal(username)
+    # the other workers only after the commit: before it they could cache the old row again
+    state.session.info.setdefault(PRINCIPAL_CHANGES, set()).update(usernames)
 
-async def get_current_user(token: str = Depends(oauth2_schem), db: Session = Depends(get_db)):
+@event.listens_for(Session, "after_commit")
+def _bump_committed_users(session):
+    usernames = session.info.pop(PRINCIPAL_CHANGES, None)
+    if usernames:
+        principal_versions.bump_soon(usernames)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop(PRINCIPAL_CHANGES, None)
+
+async def _load_principal(db: AsyncSession, token_data: TokenData):
+    query = select(DBUser.id, DBUser.username, DBUser.disabled, DBUser.token_version)
+    if token_data.user_id is not None:
+        query = query.where(DBUser.id == token_data.user_id)
+    else:
+        # token issued before the uid claim
+        query = query.where(DBUser.username == token_data.username)
+    row = (await db.execute(query)).first()
+    if row is None or row.username != token_data.username:
+        return None
+    if token_data.token_version is not None and token_data.token_version != row.token_version:
+        return None
+    return Principal(id=row.id, username=row.username, disabled=bool(row.disabled), token_version=row.token_version)
+
+
+async def get_current_user(token: str = Depends(oauth2_schem), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,10 +171,30 @@ async def get_current_user(token: str = Depends(oauth2_schem), db: Session = Dep
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
+        token_data = TokenData(
+            username=username,
+            user_id=payload.get("uid"),
+            disabled=payload.get("disabled", False),
+            token_version=payload.get("tv"),
+            jti=payload.get("jti"),
+        )
+    except (JWTError, ValidationError):
         raise credentials_exception
-    user = get_user_by_username(db, username=token_data.username)
-    if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+    if token_data.disabled:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+
+    cache_key = (token_data.username, token_data.jti or hashlib.sha256(token.encode()).hexdigest())
+    # read before the user row: a change committed in between only costs another load
+    version = await principal_versions.get_version(token_data.username)
+    cached = _principal_cache.get(cache_key)
+    if cached is not None and version is not None and cached[1] == version:
+        principal = cached[0]
+    else:
+        principal = await _load_principal(db, token_data)
+        if principal is None:
+            raise credentials_exception
+        if version is not None:
+            _principal_cache.set(cache_key, (principal, version))
+    if principal.disabled:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    return principal
\ No newline at end of file
@@ -1,6 +1,6 @@
 from datetime import date, datetime
-from typing import List, Optional
-from pydantic import BaseModel, field_validator, ConfigDict
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field, field_validator, ConfigDict
 
 class JobBase(BaseModel):
     # on creation, id is None because not yet created
@@ -45,6 +45,47 @@ class JobResponse(JobBase):
     def format_date(cls, v: datetime):
         return v.strftime("%d/%m/%Y") if isinstance(v, date) else v
 
+class ImportStats(BaseModel):
+    fetched: int = 0
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0 # duplicates in the batch or unchanged rows
+    merged: int = 0 # near-duplicates folded into an existing job
+    failed: int = 0
+
+    def add(self, other: "ImportStats") -> None:
+        for name in type(self).model_fields:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+class SourceProgress(BaseModel):
+    status: str = "pending" # pending, running, succeeded, failed
+    stats: ImportStats = Field(default_factory=ImportStats)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None # why the source failed, e.g. its circuit is open
+
+class StageMetrics(BaseModel):
+    workers: int = 1
+    items_in: int = 0
+    items_out: int = 0
+    busy_seconds: float = 0.0 # time spent working
+    blocked_seconds: float = 0.0 # time spent waiting for the next stage (backpressure)
+    items_per_second: float = 0.0
+
+class ImportRunResponse(BaseModel):
+    id: str
+    status: str # pending, running, succeeded, failed, interrupted
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    sources: Dict[str, SourceProgress] = {}
+    stats: ImportStats = Field(default_factory=ImportStats)
+    stages: Optional[Dict[str, StageMetrics]] = None
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 class LikedJobSchema(BaseModel):
     job: JobResponse
 
@@ -99,12 +140,67 @@ class UserResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserJobChange(BaseModel):
+    # compact answer of the like/seen/apply endpoints (?compact=true)
+    user_id: int
+    job_id: int
+    kind: str # liked, seen, applied
+    action: str # added, removed
+    version: int # user's state_version after the change, also sent as ETag
+
+class InteractionEvent(BaseModel):
+    job_id: int
+    kind: Literal["liked", "seen", "applied"]
+
+class InteractionResult(BaseModel):
+    job_id: int
+    kind: str
+    status: Literal["added", "duplicate", "not_found"] # duplicate: already in base or earlier in the batch
+
+class InteractionBatchResponse(BaseModel):
+    # answer of POST /jobs/interactions:batch, one result per event in the order they were sent
+    user_id: int
+    version: int # user's state_version after the batch, also sent as ETag
+    results: List[InteractionResult]
+
+class ActivityJob(BaseModel):
+    id: int
+    # NULL for some imported offers, as in JobResponse
+    title: Optional[str] = None
+    company: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ActivityItem(BaseModel):
+    id: int # id of the liked/seen/applied row
+    job_id: int
+    job: Optional[ActivityJob] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class UserActivityPage(BaseModel):
+    kind: str
+    version: int
+    items: List[ActivityItem]
+    next_cursor: Optional[str] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 class TokenData(BaseModel):
     username: str = None
+    user_id: Optional[int] = None
+    disabled: bool = False
+    token_version: Optional[int] = None
+    jti: Optional[str] = None # token id
+
+class Principal(BaseModel):
+    # authenticated user as described by its access token, no DB object
+    id: int
+    username: str
+    disabled: bool = False
+    token_version: int = 0
 
 class ForgotPasswordRequest(BaseModel):
     email: str
@@ -9,6 +9,17 @@ class Settings:
     DATABASE_URL: str| None = os.environ.get("DATABASE_URL")
     if not DATABASE_URL:
         raise ValueError("DATABASE_URL environment variable is not set")
+    # connection pool of the async engine (ignored on SQLite)
+    DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT: float = float(os.environ.get("DB_POOL_TIMEOUT", 10)) # seconds waiting for a free connection
+    DB_POOL_RECYCLE: int = int(os.environ.get("DB_POOL_RECYCLE", 1800)) # seconds, below the server idle timeout
+    DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    # Server: False in the workers of entrypoint.sh, which runs prestart.py once before starting them
+    RUN_PRESTART: bool = os.environ.get("RUN_PRESTART", "true").lower() == "true"
+    # worker processes started by entrypoint.sh: more than one requires the redis backends (checked by prestart.py)
+    WEB_CONCURRENCY: int = int(os.environ.get("WEB_CONCURRENCY", 1))
 
     # Auth
     SECRET_KEY: str | None = os.environ.get("SECRET_KEY")
@@ -17,6 +28,15 @@ class Settings:
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     RESET_TOKEN_EXPIRE_MINUTES: int = 15
+    # bcrypt cost factor: changing it rehashes each password at the user's next login
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", 32)) # waiting jobs before answering 503
+    # authenticated principals cached per access token (sub, jti), checked against a version of the user bumped by
+    # every committed update: memory (one process only) or redis (shared, required with WEB_CONCURRENCY > 1)
+    PRINCIPAL_CACHE_SIZE: int = int(os.environ.get("PRINCIPAL_CACHE_SIZE", 10000))
+    PRINCIPAL_CACHE_TTL: float = float(os.environ.get("PRINCIPAL_CACHE_TTL", 60)) # seconds
+    PRINCIPAL_CACHE_BACKEND: Literal["memory", "redis"] = os.environ.get("PRINCIPAL_CACHE_BACKEND", "memory")
 
     SERP_API_KEY: str| None = os.environ.get("SERP_API_KEY")
     if not SERP_API_KEY:
@@ -32,6 +52,42 @@ class Settings:
     MAILGUN_API_URL: str = f"https://api.mailgun.net/v3/{MAILGUN_DOMAIN_NAME}/messages"
     MAILGUN_API_KEY: str| None = os.environ.get("MAILGUN_API_KEY")
 
+    # France Travail harvesting (the API serves at most 150 offers per page and 3150 per search)
+    FRANCETRAVAIL_PAGE_SIZE: int = 150
+    FRANCETRAVAIL_MAX_RESULTS: int = 3150
+    FRANCETRAVAIL_CONCURRENCY: int = int(os.environ.get("FRANCETRAVAIL_CONCURRENCY", 4))
+    FRANCETRAVAIL_RATE_LIMIT: float = float(os.environ.get("FRANCETRAVAIL_RATE_LIMIT", 8)) # requests per second
+    FRANCETRAVAIL_MAX_AGE_DAYS: int = int(os.environ.get("FRANCETRAVAIL_MAX_AGE_DAYS", 90))
+    FRANCETRAVAIL_TIME_BUDGET: float = float(os.environ.get("FRANCETRAVAIL_TIME_BUDGET", 900)) # seconds for a whole import
+
+    # Remotive: a single streamed feed
+    REMOTIVE_RATE_LIMIT: float = float(os.environ.get("REMOTIVE_RATE_LIMIT", 1))
+    REMOTIVE_TIME_BUDGET: float = float(os.environ.get("REMOTIVE_TIME_BUDGET", 120))
+
+    # SerpAPI (Google Jobs): every page costs a search credit
+    SERPAPI_QUERY: str = os.environ.get("SERPAPI_QUERY", "remote developer")
+    SERPAPI_LOCATION: str = os.environ.get("SERPAPI_LOCATION", "")
+    SERPAPI_MAX_PAGES: int = int(os.environ.get("SERPAPI_MAX_PAGES", 3))
+    SERPAPI_RATE_LIMIT: float = float(os.environ.get("SERPAPI_RATE_LIMIT", 1))
+    SERPAPI_TIME_BUDGET: float = float(os.environ.get("SERPAPI_TIME_BUDGET", 60))
+
+    # Job sources: modules registering a JobSource, and defaults of their policies
+    JOB_SOURCE_MODULES: list = os.environ.get(
+        "JOB_SOURCE_MODULES",
+        "services.external_apis.remotive,services.external_apis.francetravail,services.external_apis.serpapi",
+    ).split(",")
+    SOURCE_TIME_BUDGET: float = float(os.environ.get("SOURCE_TIME_BUDGET", 300)) # seconds for a whole import
+    CIRCUIT_BREAKER_FAILURES: int = int(os.environ.get("CIRCUIT_BREAKER_FAILURES", 5)) # consecutive failed requests
+    CIRCUIT_BREAKER_RESET_SECONDS: float = float(os.environ.get("CIRCUIT_BREAKER_RESET_SECONDS", 300))
+
+    # Outgoing HTTP (shared client for the job sources)
+    HTTP_TIMEOUT: float = float(os.environ.get("HTTP_TIMEOUT", 20))
+    HTTP_CONNECT_TIMEOUT: float = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_MAX_CONNECTIONS: int = int(os.environ.get("HTTP_MAX_CONNECTIONS", 20))
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = int(os.environ.get("HTTP_MAX_CONNECTIONS_PER_HOST", 4))
+    HTTP_RETRIES: int = int(os.environ.get("HTTP_RETRIES", 3))
+    HTTP_BACKOFF_BASE: float = float(os.environ.get("HTTP_BACKOFF_BASE", 0.5))
+
     CORS_ORIGINS: list = [
         "http://localhost",
         "http://localhost:5173",
@@ -49,6 +105,35 @@ class Settings:
 
     # Jobs
     JOB_LIMIT: int = 20
+    JOB_LIST_DESCRIPTION_LENGTH: int = int(os.environ.get("JOB_LIST_DESCRIPTION_LENGTH", 300)) # characters sent by the listing
+    EXPORT_BATCH_SIZE: int = int(os.environ.get("EXPORT_BATCH_SIZE", 1000)) # rows fetched per round trip by /jobs/export
+    INTERACTION_BATCH_MAX_EVENTS: int = int(os.environ.get("INTERACTION_BATCH_MAX_EVENTS", 500)) # events per POST /jobs/interactions:batch
+    # seen jobs are written behind: in one insert every few seconds, or as soon as enough are waiting
+    SEEN_BUFFER_FLUSH_SECONDS: float = float(os.environ.get("SEEN_BUFFER_FLUSH_SECONDS", 2))
+    SEEN_BUFFER_MAX_EVENTS: int = int(os.environ.get("SEEN_BUFFER_MAX_EVENTS", 500))
+    # memory (one process only) or redis (shared between the workers, required with WEB_CONCURRENCY > 1)
+    SEEN_BUFFER_BACKEND: Literal["memory", "redis"] = os.environ.get("SEEN_BUFFER_BACKEND", "memory")
+    # redis: views claimed by a worker stopped before writing them are taken by another one after this delay
+    SEEN_BUFFER_CLAIM_TIMEOUT: float = float(os.environ.get("SEEN_BUFFER_CLAIM_TIMEOUT", 60))
+    SYNC_WATERMARK_OVERLAP_HOURS: int = int(os.environ.get("SYNC_WATERMARK_OVERLAP_HOURS", 24))
+    IMPORT_CHUNK_SIZE: int = int(os.environ.get("IMPORT_CHUNK_SIZE", 500))
+    # import pipeline: batches waiting between two stages, and workers of the normalise (threads) / write stages
+    IMPORT_QUEUE_SIZE: int = int(os.environ.get("IMPORT_QUEUE_SIZE", 8))
+    IMPORT_NORMALISE_CONCURRENCY: int = int(os.environ.get("IMPORT_NORMALISE_CONCURRENCY", 1))
+    IMPORT_WRITE_CONCURRENCY: int = int(os.environ.get("IMPORT_WRITE_CONCURRENCY", 1))
+    # near-duplicates: SimHash bits that may differ (same title + company + location, or only the same title)
+    DEDUP_SAME_KEY_DISTANCE: int = int(os.environ.get("DEDUP_SAME_KEY_DISTANCE", 3))
+    DEDUP_MAX_DISTANCE: int = int(os.environ.get("DEDUP_MAX_DISTANCE", 3)) # at most 3, the LSH bands can't find more
+    DEDUP_MIN_SHINGLES: int = int(os.environ.get("DEDUP_MIN_SHINGLES", 10)) # shorter descriptions are not compared
+    # recommendations: size of the hashed job vectors, and how often a process checks if its index must be rebuilt
+    RECOMMEND_VECTOR_DIM: int = int(os.environ.get("RECOMMEND_VECTOR_DIM", 128))
+    RECOMMEND_INDEX_REFRESH_SECONDS: float = float(os.environ.get("RECOMMEND_INDEX_REFRESH_SECONDS", 60))
+
+    # Response cache of the job listing: memory (per process) or redis (shared between workers)
+    RESPONSE_CACHE_BACKEND: Literal["memory", "redis"] = os.environ.get("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    RESPONSE_CACHE_TTL: int = int(os.environ.get("RESPONSE_CACHE_TTL", 24 * 3600)) # seconds, redis only
+    REDIS_URL: str = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 
     class Config:
         env_file = ".env"
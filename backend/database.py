@@ -1,27 +1,71 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean
+from sqlalchemy import event, Column, Integer, String, Boolean
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
 
 from core.config import settings
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+# asyncio drivers used in place of the sync ones of DATABASE_URL (psycopg2 stays for alembic)
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+SYNC_DRIVERS = {"postgresql": "postgresql+psycopg2", "sqlite": "sqlite+pysqlite"}
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+def async_database_url(url: str):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.drivername != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url
+
+
+def sync_database_url(url: str):
+    # the migrations run on a sync engine
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in SYNC_DRIVERS and url.drivername != SYNC_DRIVERS[backend]:
+        url = url.set(drivername=SYNC_DRIVERS[backend])
+    return url
+
+
+SQLALCHEMY_DATABASE_URL = async_database_url(settings.DATABASE_URL)
+
+if SQLALCHEMY_DATABASE_URL.get_backend_name() == "sqlite":
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
+else:
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
+if engine.dialect.name == "sqlite":
+    # SQLite ignores foreign keys unless asked (inserting a link to a missing job must fail like on PostgreSQL)
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
 Base = declarative_base()
 
 #to manage database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# to create table (to be called on starting)
-def create_db_tables():
-    # checkfirst=True will not create the table if it already exists
-    Base.metadata.create_all(bind=engine, checkfirst=True)
+# expire_on_commit=False: objects stay readable after commit, an async session can't lazy load them again
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
 
 # to get a DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# to get the dialect-specific INSERT supporting ON CONFLICT (PostgreSQL in prod, SQLite in dev)
+def dialect_insert(db: AsyncSession, table):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"ON CONFLICT inserts are not supported on '{dialect}'")
@@ -1,14 +1,24 @@
 #!/bin/bash
+set -e
+
+# start cron (it daemonizes itself)
+cron
 
-# Start Uvicorn
 if [ "$ENV" = "prod" ]; then
-    uvicorn main:app --host 0.0.0.0 --port 8000 --proxy-headers &
-else
-    uvicorn main:app --host 0.0.0.0 --port 8000 --proxy-headers --reload &
+    # one worker process per core, read by prestart.py to check the backends shared between them
+    export WEB_CONCURRENCY="${WEB_CONCURRENCY:-$(nproc)}"
 fi
 
-# start cron job
-cron -f
+# one-shot startup: worker backends, migrations, interrupted import runs, banner
+python prestart.py
+export RUN_PRESTART=false
 
-# wait for both processes to finish
-wait
+if [ "$ENV" = "prod" ]; then
+    # exec: uvicorn gets the SIGTERM of `docker stop` and shuts the workers down
+    # gracefully (requests in flight and the seen jobs buffer are finished before GRACEFUL_TIMEOUT)
+    exec uvicorn main:app --host 0.0.0.0 --port 8000 --proxy-headers \
+        --workers "$WEB_CONCURRENCY" \
+        --timeout-graceful-shutdown "${GRACEFUL_TIMEOUT:-30}"
+else
+    exec uvicorn main:app --host 0.0.0.0 --port 8000 --proxy-headers --reload
+fi
@@ -3,11 +3,17 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from core.config import Settings, settings
 
-from database import create_db_tables
+from database import engine
 from models import models as orm_models
+from prestart import prestart
 
 from routers import auth as auth_router
 from routers import jobs as jobs_router
+from services.http_client import close_http_client
+from services.job_recommender import close_recommender, start_recommender
+from services.principal_versions import close_principal_versions
+from services.response_cache import close_response_cache
+from services.seen_buffer import close_seen_buffer, start_seen_buffer
 from utils.colorText import colorText
 
 settings = Settings()
@@ -29,13 +35,23 @@ app.add_middleware(
 )
 
 @app.on_event("startup")
-def on_startup():
-    print("Creating database tables...")
-    create_db_tables() # create tables for all tables
-    print("Database tables created (if they didn't exist).")
-    print(colorText("---------------------------------------------------", "vert_fonce"))
-    print(colorText("     Welcome to the NextOffer API! 🌞", "vert_fonce"))
-    print(colorText("---------------------------------------------------", "vert_fonce"))
+async def on_startup():
+    # in prod the workers skip it: entrypoint.sh runs prestart.py once before starting them
+    if settings.RUN_PRESTART:
+        await prestart()
+    start_seen_buffer()
+    start_recommender()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # before the engine is disposed: the seen jobs still waiting are written
+    await close_seen_buffer()
+    await close_recommender()
+    await close_http_client()
+    await close_response_cache()
+    await close_principal_versions()
+    await engine.dispose()
+
 app.include_router(auth_router.router, prefix="/api")
 app.include_router(jobs_router.router, prefix="/api")
 
@@ -0,0 +1,60 @@
+"""
+Schéma de la base à la révision BASELINE_REVISION, tel que create_all le créait avant les migrations suivantes.
+Les révisions jusqu'à BASELINE_REVISION ne créent pas les tables : une base vide part de ce schéma (figé, il ne
+suit pas models.py), puis passe par toutes les migrations suivantes.
+"""
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, inspect
+
+BASELINE_REVISION = "4fadec73b3de"
+
+metadata = MetaData()
+
+Table(
+    "jobs", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("external_id", String, unique=True),
+    Column("title", String),
+    Column("company", String),
+    Column("url", String),
+    Column("source", String),
+    Column("location", String),
+    Column("salary", String),
+    Column("description", Text),
+    Column("typeContrat", String),
+    Column("dateCreation", DateTime),
+    Column("liked", Boolean),
+)
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("hashed_password", String),
+    Column("disabled", Boolean),
+    Column("reset_password_token", String, nullable=True),
+    Column("reset_password_expires_at", DateTime, nullable=True),
+)
+
+for link_table in ("liked_jobs", "seen_jobs", "applied_jobs"):
+    Table(
+        link_table, metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("user_id", Integer, ForeignKey("users.id")),
+        Column("job_id", Integer, ForeignKey("jobs.id")),
+    )
+
+
+def bootstrap(connection, migration_context, script) -> None:
+    """
+    Base sans version Alembic : vide, elle reçoit le schéma de départ ; créée par create_all avant les migrations,
+    elle a déjà ce schéma. Dans les deux cas elle est marquée à BASELINE_REVISION, les migrations suivantes s'appliquent.
+    """
+    tables = inspect(connection).get_table_names()
+    if "alembic_version" not in tables:
+        if "jobs" not in tables:
+            metadata.create_all(connection)
+        migration_context.stamp(script, BASELINE_REVISION)
+    # ends the transaction begun by the inspection too: left open, alembic would run the migrations in it
+    # as in a caller's transaction, and never commit them
+    connection.commit()
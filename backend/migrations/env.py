@@ -1,9 +1,15 @@
 from logging.config import fileConfig
-from models.models import Base
-from sqlalchemy import engine_from_config
+from sqlalchemy import create_engine
 from sqlalchemy import pool
 
 from alembic import context
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from core.config import settings
+from database import sync_database_url
+from migrations import baseline
+from models.models import Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -11,8 +17,9 @@ config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
+# disable_existing_loggers=False: prestart.py runs the migrations in the server's process
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -20,10 +27,8 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
-# other values from the config, defined by the needs of env.py,
-# can be acquired:
-# my_important_option = config.get_main_option("my_important_option")
-# ... etc.
+# the application's database, or the one given by the caller (tests)
+url = sync_database_url(config.attributes.get("url") or settings.DATABASE_URL)
 
 
 def run_migrations_offline() -> None:
@@ -38,9 +43,8 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
+        url=url.render_as_string(hide_password=False),
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
@@ -57,13 +61,12 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    connectable = create_engine(url, poolclass=pool.NullPool)
 
     with connectable.connect() as connection:
+        # a database without alembic version (empty, or created by create_all) starts from the baseline schema
+        baseline.bootstrap(connection, MigrationContext.configure(connection), ScriptDirectory.from_config(config))
+
         context.configure(
             connection=connection, target_metadata=target_metadata
         )
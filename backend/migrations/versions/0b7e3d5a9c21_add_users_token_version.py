@@ -0,0 +1,28 @@
+"""Add users.token_version
+
+Revision ID: 0b7e3d5a9c21
+Revises: f1c8a2b5d364
+Create Date: 2026-10-18 16:42:11.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7e3d5a9c21'
+down_revision: Union[str, None] = 'f1c8a2b5d364'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
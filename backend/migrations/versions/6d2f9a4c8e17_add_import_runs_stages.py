@@ -0,0 +1,28 @@
+"""Add import_runs.stages
+
+Revision ID: 6d2f9a4c8e17
+Revises: 0b7e3d5a9c21
+Create Date: 2026-10-18 18:05:37.612094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2f9a4c8e17'
+down_revision: Union[str, None] = '0b7e3d5a9c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('import_runs', sa.Column('stages', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('import_runs', 'stages')
@@ -0,0 +1,54 @@
+"""Add job fingerprints, aliases and SimHash bands
+
+Revision ID: 9a4e1c7b3f52
+Revises: 6d2f9a4c8e17
+Create Date: 2026-10-18 19:12:48.330715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e1c7b3f52'
+down_revision: Union[str, None] = '6d2f9a4c8e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing jobs are fingerprinted by the next import (JobAggregator.backfill_fingerprints)
+    op.add_column('jobs', sa.Column('fingerprint', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('simhash', sa.BigInteger(), nullable=True))
+    op.create_index('ix_jobs_fingerprint', 'jobs', ['fingerprint'], unique=False)
+    op.create_table(
+        'job_aliases',
+        sa.Column('external_id', sa.String(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('external_id'),
+    )
+    op.create_index(op.f('ix_job_aliases_job_id'), 'job_aliases', ['job_id'], unique=False)
+    op.create_table(
+        'job_simhash_bands',
+        sa.Column('band_key', sa.Integer(), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['job_id'], ['jobs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('band_key', 'job_id'),
+    )
+    op.create_index(op.f('ix_job_simhash_bands_job_id'), 'job_simhash_bands', ['job_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_job_simhash_bands_job_id'), table_name='job_simhash_bands')
+    op.drop_table('job_simhash_bands')
+    op.drop_index(op.f('ix_job_aliases_job_id'), table_name='job_aliases')
+    op.drop_table('job_aliases')
+    op.drop_index('ix_jobs_fingerprint', table_name='jobs')
+    op.drop_column('jobs', 'simhash')
+    op.drop_column('jobs', 'fingerprint')
@@ -0,0 +1,61 @@
+"""Add weighted full-text search_vector to jobs
+
+Revision ID: a41f7c3d9e88
+Revises: d3a9b6e4c215
+Create Date: 2026-10-18 12:41:52.630419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f7c3d9e88'
+down_revision: Union[str, None] = 'd3a9b6e4c215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        # no tsvector: a standalone FTS5 table keyed by jobs.id, filled by JobAggregator (services.job_search)
+        op.add_column('jobs', sa.Column('search_vector', sa.Text(), nullable=True))
+        op.execute(
+            "CREATE VIRTUAL TABLE jobs_fts "
+            "USING fts5(title, company, location, description, tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO jobs_fts (rowid, title, company, location, description) "
+            "SELECT id, title, company, location, description FROM jobs"
+        )
+        return
+
+    op.add_column('jobs', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # same weights as services.job_search.search_vector_expression, new rows are indexed by JobAggregator
+    fields = (("title", "A"), ("company", "B"), ("location", "C"), ("description", "D"))
+    vector = " || ".join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({field}, '')), '{weight}')"
+        for field, weight in fields
+        for config in ("french", "english")
+    )
+    op.execute(f"UPDATE jobs SET search_vector = {vector}")
+
+    op.create_index('ix_jobs_search_vector', 'jobs', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE jobs_fts")
+    else:
+        op.drop_index('ix_jobs_search_vector', table_name='jobs')
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.drop_column('search_vector')
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite batch mode doesn't reflect expression indexes: the recreated jobs table lost it
+        op.create_index('ix_jobs_location_lower', 'jobs', [sa.text('lower(location)')])
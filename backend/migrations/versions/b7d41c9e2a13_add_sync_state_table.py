@@ -0,0 +1,34 @@
+"""Add sync_state table for incremental imports
+
+Revision ID: b7d41c9e2a13
+Revises: 4fadec73b3de
+Create Date: 2026-10-18 09:12:44.512311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c9e2a13'
+down_revision: Union[str, None] = '4fadec73b3de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'sync_state',
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('last_success_at', sa.DateTime(), nullable=True),
+        sa.Column('last_date_creation', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('source'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('sync_state')
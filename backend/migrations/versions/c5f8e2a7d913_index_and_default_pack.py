@@ -0,0 +1,84 @@
+"""Indexes of the hot query paths, NOT NULL link columns and server defaults
+
+Revision ID: c5f8e2a7d913
+Revises: 9a4e1c7b3f52
+Create Date: 2026-10-18 20:31:09.457120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f8e2a7d913'
+down_revision: Union[str, None] = '9a4e1c7b3f52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LINK_TABLES = ('liked_jobs', 'seen_jobs', 'applied_jobs')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # batch mode: SQLite can't ALTER a column, it recreates the table; PostgreSQL runs the ALTER as usual
+    # jobs: url lookups of the import, and defaults computed per row by the database
+    op.create_index('ix_jobs_url', 'jobs', ['url'])
+    op.execute('UPDATE jobs SET "dateCreation" = CURRENT_TIMESTAMP WHERE "dateCreation" IS NULL')
+    op.execute('UPDATE jobs SET liked = false WHERE liked IS NULL')
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.alter_column('dateCreation', existing_type=sa.DateTime(), nullable=False, server_default=sa.func.now())
+        batch_op.alter_column('liked', existing_type=sa.Boolean(), nullable=False, server_default=sa.false())
+    _restore_location_index()
+
+    op.create_index('ix_job_aliases_source', 'job_aliases', ['source'])
+
+    # link tables: a row without its user or job is meaningless (and escapes the unique constraint)
+    for table in LINK_TABLES:
+        op.execute(f'DELETE FROM {table} WHERE user_id IS NULL OR job_id IS NULL')
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.alter_column('job_id', existing_type=sa.Integer(), nullable=False)
+        # pages of a user's links, most recent first
+        op.create_index(f'ix_{table}_user_id_id', table, ['user_id', 'id'])
+
+    op.execute('UPDATE users SET disabled = false WHERE disabled IS NULL')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('disabled', existing_type=sa.Boolean(), nullable=False, server_default=sa.false())
+
+    with op.batch_alter_table('import_runs') as batch_op:
+        batch_op.alter_column('status', existing_type=sa.String(), server_default='pending')
+        batch_op.alter_column('sources', existing_type=sa.JSON(), server_default='{}')
+        batch_op.alter_column('stats', existing_type=sa.JSON(), server_default='{}')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('import_runs') as batch_op:
+        batch_op.alter_column('stats', existing_type=sa.JSON(), server_default=None)
+        batch_op.alter_column('sources', existing_type=sa.JSON(), server_default=None)
+        batch_op.alter_column('status', existing_type=sa.String(), server_default=None)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('disabled', existing_type=sa.Boolean(), nullable=True, server_default=None)
+
+    for table in LINK_TABLES:
+        op.drop_index(f'ix_{table}_user_id_id', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('job_id', existing_type=sa.Integer(), nullable=True)
+            batch_op.alter_column('user_id', existing_type=sa.Integer(), nullable=True)
+
+    op.drop_index('ix_job_aliases_source', table_name='job_aliases')
+
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.alter_column('liked', existing_type=sa.Boolean(), nullable=True, server_default=None)
+        batch_op.alter_column('dateCreation', existing_type=sa.DateTime(), nullable=True, server_default=None)
+    _restore_location_index()
+    op.drop_index('ix_jobs_url', table_name='jobs')
+
+
+def _restore_location_index() -> None:
+    # SQLite batch mode doesn't reflect expression indexes: the recreated jobs table lost it
+    if op.get_bind().dialect.name == 'sqlite':
+        op.create_index('ix_jobs_location_lower', 'jobs', [sa.text('lower(location)')])
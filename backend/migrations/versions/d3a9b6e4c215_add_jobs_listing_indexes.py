@@ -0,0 +1,43 @@
+"""Add jobs listing indexes for keyset pagination and filters
+
+Revision ID: d3a9b6e4c215
+Revises: 5c2e8f1a7d40
+Create Date: 2026-10-18 11:20:05.118736
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9b6e4c215'
+down_revision: Union[str, None] = '5c2e8f1a7d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rows without a date would never be reached by the (dateCreation, id) keyset
+    op.execute('UPDATE jobs SET "dateCreation" = CURRENT_TIMESTAMP WHERE "dateCreation" IS NULL')
+
+    op.create_index('ix_jobs_date_creation_id', 'jobs', ['dateCreation', 'id'])
+    op.create_index('ix_jobs_source_date_creation_id', 'jobs', ['source', 'dateCreation', 'id'])
+    op.create_index('ix_jobs_type_contrat_date_creation_id', 'jobs', ['typeContrat', 'dateCreation', 'id'])
+    # varchar_pattern_ops (PostgreSQL): LIKE 'prefix%' reads the index whatever the collation
+    operator_class = ' varchar_pattern_ops' if op.get_bind().dialect.name == 'postgresql' else ''
+    op.create_index(
+        'ix_jobs_location_lower',
+        'jobs',
+        [sa.text(f'lower(location){operator_class}')],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_location_lower', table_name='jobs')
+    op.drop_index('ix_jobs_type_contrat_date_creation_id', table_name='jobs')
+    op.drop_index('ix_jobs_source_date_creation_id', table_name='jobs')
+    op.drop_index('ix_jobs_date_creation_id', table_name='jobs')
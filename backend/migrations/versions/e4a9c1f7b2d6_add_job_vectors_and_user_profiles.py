@@ -0,0 +1,31 @@
+"""Job vectors and user profile vectors of the recommendations
+
+Revision ID: e4a9c1f7b2d6
+Revises: c5f8e2a7d913
+Create Date: 2026-10-18 22:12:41.608315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c1f7b2d6'
+down_revision: Union[str, None] = 'c5f8e2a7d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # computed by the next import (backfill), the profiles on the next like or recommendation
+    op.add_column('jobs', sa.Column('vector', sa.LargeBinary(), nullable=True))
+    op.add_column('users', sa.Column('profile_vector', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'profile_vector')
+    op.drop_column('jobs', 'vector')
@@ -0,0 +1,39 @@
+"""Unique (user_id, job_id) on liked_jobs, seen_jobs and applied_jobs
+
+Revision ID: e6b2d0f4a917
+Revises: a41f7c3d9e88
+Create Date: 2026-10-18 13:58:16.274901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b2d0f4a917'
+down_revision: Union[str, None] = 'a41f7c3d9e88'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LINK_TABLES = ('liked_jobs', 'seen_jobs', 'applied_jobs')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in LINK_TABLES:
+        # keep the oldest row of every (user_id, job_id) pair before adding the constraint
+        op.execute(
+            f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table} GROUP BY user_id, job_id)"
+        )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_unique_constraint(f'uq_{table}_user_id_job_id', ['user_id', 'job_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in LINK_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'uq_{table}_user_id_job_id', type_='unique')
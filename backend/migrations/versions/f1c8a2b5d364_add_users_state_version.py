@@ -0,0 +1,28 @@
+"""Add users.state_version
+
+Revision ID: f1c8a2b5d364
+Revises: e6b2d0f4a917
+Create Date: 2026-10-18 15:07:39.851260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8a2b5d364'
+down_revision: Union[str, None] = 'e6b2d0f4a917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('state_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'state_version')
@@ -1,6 +1,7 @@
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Date, Table, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Text, DateTime, Date, Table, ForeignKey, JSON, Index, LargeBinary, UniqueConstraint, false, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from database import Base
 from datetime import date, datetime, timezone
 
@@ -17,8 +18,32 @@ class Job(Base):
     salary = Column(String)
     description = Column(Text)
     typeContrat = Column(String)
-    dateCreation = Column(DateTime, default=datetime.now(timezone.utc))
-    liked = Column(Boolean, default=False)
+    # callable and server default: evaluated for every row, not once when the module is imported
+    dateCreation = Column(DateTime, nullable=False, default=datetime.now, server_default=func.now())
+    liked = Column(Boolean, nullable=False, default=False, server_default=false())
+    # near-duplicate detection (services/job_dedup.py): key of title + company + location, SimHash of the description
+    fingerprint = Column(String, nullable=True)
+    simhash = Column(BigInteger, nullable=True)
+    # weighted full-text vector kept up to date by JobAggregator (PostgreSQL only, SQLite uses jobs_fts)
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
+    # hashed term vector of title + description for the recommendations (services/job_recommender.py), float32 bytes
+    vector = deferred(Column(LargeBinary, nullable=True))
+
+    # listing is paginated on (dateCreation, id), optionally filtered by source / typeContrat / location prefix
+    __table_args__ = (
+        Index("ix_jobs_date_creation_id", dateCreation, id),
+        Index("ix_jobs_source_date_creation_id", source, dateCreation, id),
+        Index("ix_jobs_type_contrat_date_creation_id", typeContrat, dateCreation, id),
+        Index(
+            "ix_jobs_location_lower",
+            func.lower(location).label("location_lower"),
+            postgresql_ops={"location_lower": "varchar_pattern_ops"},
+        ),
+        Index("ix_jobs_search_vector", search_vector, postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_jobs_fingerprint", fingerprint),
+        # url lookups of the import (an url belongs to a single offer)
+        Index("ix_jobs_url", url),
+    )
 
     def to_dict(self):
         if isinstance(self.dateCreation, str):
@@ -44,6 +69,45 @@ class Job(Base):
         }
 
 
+class JobAlias(Base):
+    __tablename__ = "job_aliases"
+
+    # offer of a source merged into an existing (canonical) job because it is a near-duplicate
+    external_id = Column(String, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    source = Column(String, nullable=False, index=True)
+
+
+class JobSimhashBand(Base):
+    __tablename__ = "job_simhash_bands"
+
+    # LSH index: the jobs sharing a band of their SimHash are the near-duplicate candidates
+    band_key = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    source = Column(String, primary_key=True) # same value as Job.source
+    last_success_at = Column(DateTime, nullable=True) # end of the last import without errors
+    last_date_creation = Column(DateTime, nullable=True) # newest dateCreation seen (watermark)
+
+
+class ImportRun(Base):
+    __tablename__ = "import_runs"
+
+    id = Column(String, primary_key=True) # uuid4 hex, returned by POST /jobs/import
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    sources = Column(JSON, nullable=False, default=dict, server_default="{}") # per-source SourceProgress
+    stats = Column(JSON, nullable=False, default=dict, server_default="{}") # total ImportStats
+    stages = Column(JSON, nullable=True) # per-stage StageMetrics of the pipeline
+    error = Column(Text, nullable=True)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -51,9 +115,13 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
-    disabled = Column(Boolean, default=False)
+    disabled = Column(Boolean, nullable=False, default=False, server_default=false())
     reset_password_token = Column(String, nullable=True)
     reset_password_expires_at = Column(DateTime, nullable=True)
+    state_version = Column(Integer, nullable=False, default=0, server_default="0") # bumped on every like/seen/apply change
+    token_version = Column(Integer, nullable=False, default=0, server_default="0") # bumped to revoke the issued access tokens
+    # sum of the vectors of the liked jobs, updated on like / unlike (float32 bytes)
+    profile_vector = deferred(Column(LargeBinary, nullable=True))
     # favorite_jobs = relationship("Job", secondary="favorite_jobs")
     liked_jobs = relationship("LikedJob", back_populates="user")
     seen_jobs = relationship("SeenJob", back_populates="user")
@@ -64,28 +132,44 @@ class LikedJob(Base):
     __tablename__ = "liked_jobs"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    job_id = Column(Integer, ForeignKey("jobs.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
 
     user = relationship("User", back_populates="liked_jobs")
     job = relationship("Job", lazy="joined")
 
+    # the unique constraint backs ON CONFLICT writes, (user_id, id) the most-recent-first pages of a user
+    __table_args__ = (
+        UniqueConstraint("user_id", "job_id", name="uq_liked_jobs_user_id_job_id"),
+        Index("ix_liked_jobs_user_id_id", "user_id", "id"),
+    )
+
 class SeenJob(Base):
     __tablename__ = "seen_jobs"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    job_id = Column(Integer, ForeignKey("jobs.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
 
     user = relationship("User", back_populates="seen_jobs")
     job = relationship("Job", lazy="joined")
 
+    __table_args__ = (
+        UniqueConstraint("user_id", "job_id", name="uq_seen_jobs_user_id_job_id"),
+        Index("ix_seen_jobs_user_id_id", "user_id", "id"),
+    )
+
 class AppliedJob(Base):
     __tablename__ = "applied_jobs"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    job_id = Column(Integer, ForeignKey("jobs.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=False)
 
     user = relationship("User", back_populates="applied_jobs")
     job = relationship("Job", lazy="joined")
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "job_id", name="uq_applied_jobs_user_id_job_id"),
+        Index("ix_applied_jobs_user_id_id", "user_id", "id"),
+    )
@@ -0,0 +1,67 @@
+"""
+Démarrage en une fois, avant les workers du serveur (entrypoint.sh en prod) :
+vérification des backends partagés, migrations (alembic upgrade head), runs d'import coupés par l'arrêt précédent, bannière.
+    python prestart.py
+Sans étape séparée (dev, tests), main.py l'exécute au démarrage de l'application (RUN_PRESTART=true).
+"""
+import asyncio
+import os
+
+from alembic import command
+from alembic.config import Config
+
+from core.config import settings
+from database import AsyncSessionLocal, engine
+from services.import_runner import mark_interrupted_runs
+from utils.colorText import colorText
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def check_worker_backends() -> None:
+    """
+    Refuse de démarrer plusieurs workers avec un état propre à chaque process : le cache des réponses, les vues
+    en attente d'écriture et les versions des utilisateurs authentifiés doivent alors être dans Redis.
+    """
+    if settings.WEB_CONCURRENCY <= 1:
+        return
+    per_process = [
+        name for name, backend in (
+            ("RESPONSE_CACHE_BACKEND", settings.RESPONSE_CACHE_BACKEND),
+            ("SEEN_BUFFER_BACKEND", settings.SEEN_BUFFER_BACKEND),
+            ("PRINCIPAL_CACHE_BACKEND", settings.PRINCIPAL_CACHE_BACKEND),
+        ) if backend != "redis"
+    ]
+    if per_process:
+        raise SystemExit(colorText(
+            f"{settings.WEB_CONCURRENCY} workers need the redis backend, set {' and '.join(f'{name}=redis' for name in per_process)} "
+            "(or WEB_CONCURRENCY=1).", 'rouge'
+        ))
+
+
+def run_migrations() -> None:
+    # an empty database starts from the baseline schema, then gets every migration (migrations/env.py)
+    command.upgrade(Config(ALEMBIC_INI), "head")
+
+
+async def prestart() -> None:
+    check_worker_backends()
+    print("Running database migrations...")
+    # alembic is sync: on a thread, the event loop of the dev server keeps running
+    await asyncio.to_thread(run_migrations)
+    print("Database schema up to date.")
+    # before any worker starts: a run still 'running' can't belong to a live worker
+    async with AsyncSessionLocal() as db:
+        await mark_interrupted_runs(db)
+    print(colorText("---------------------------------------------------", "vert_fonce"))
+    print(colorText("     Welcome to the NextOffer API! 🌞", "vert_fonce"))
+    print(colorText("---------------------------------------------------", "vert_fonce"))
+
+
+async def main() -> None:
+    await prestart()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,25 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from mail.send_mail import send_simple_message
 from utils.colorText import colorText
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from starlette.status import HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED
-from typing import Optional
+from typing import Literal, Optional
 from datetime import timedelta
 from jose import jwt
 from jose.exceptions import JWTError
 from datetime import datetime
 from core.config import settings
 from database import get_db
-from models.models import User as DBUser
+from models.models import AppliedJob, Job, LikedJob, SeenJob, User as DBUser
 from auth.authentication import (
     authenticate_user,
     create_access_token,
+    create_user_access_token,
     get_password_hash,
     get_current_user,
-    pwd_context
+    pwd_context,
+    revoke_user_tokens,
+    USER_JOBS_OPTIONS,
+    user_state_etag,
 )
-from auth.schemas import UserCreate, Token, UserSchema as AuthUserSchema, ForgotPasswordRequest, ResetPasswordRequest, UserResponse
+from auth.schemas import Principal, UserCreate, Token, UserSchema as AuthUserSchema, ForgotPasswordRequest, ResetPasswordRequest, UserResponse, UserActivityPage, ActivityItem
+from utils.cursor import decode_cursor, encode_cursor
+
+ACTIVITY_LINKS = {"liked": LikedJob, "seen": SeenJob, "applied": AppliedJob}
 
 router = APIRouter(
     prefix="/auth", # All paths in this router will start with /auth
@@ -27,28 +36,28 @@ router = APIRouter(
 )
 
 @router.post("/register", response_model=AuthUserSchema)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user_by_username = db.query(DBUser).filter(DBUser.username == user.username).first()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user_by_username = await db.scalar(select(DBUser).where(DBUser.username == user.username))
     if db_user_by_username:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Username already registered")
 
-    db_user_by_email = db.query(DBUser).filter(DBUser.email == user.email).first()
+    db_user_by_email = await db.scalar(select(DBUser).where(DBUser.email == user.email))
     if db_user_by_email:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
 
     new_user = DBUser(username=user.username, email=user.email, hashed_password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user, ["liked_jobs", "seen_jobs", "applied_jobs"])
 
     return new_user
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
         form_data: OAuth2PasswordRequestForm = Depends(),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
     ):
     user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
@@ -58,18 +67,65 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=AuthUserSchema)
-async def read_users_me(current_user: DBUser = Depends(get_current_user)):
-    return current_user
+async def read_users_me(current_user: Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    return await db.scalar(select(DBUser).options(*USER_JOBS_OPTIONS).where(DBUser.id == current_user.id))
+
+@router.get("/users/me/activity", response_model=UserActivityPage)
+async def read_users_me_activity(
+    request: Request,
+    response: Response,
+    kind: Literal["liked", "seen", "applied"] = Query("liked"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    # the principal comes from the token, the state version is read fresh
+    version = await db.scalar(select(DBUser.state_version).where(DBUser.id == current_user.id))
+    etag = user_state_etag(current_user.id, version, kind, cursor or "first", limit)
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    before_id = None
+    if cursor is not None:
+        try:
+            (before_id,) = decode_cursor(cursor)
+            before_id = int(before_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    links = list(await db.scalars(activity_query(ACTIVITY_LINKS[kind], current_user.id, limit + 1, before_id)))
+    has_more = len(links) > limit
+    links = links[:limit]
+
+    response.headers["ETag"] = etag
+    return UserActivityPage(
+        kind=kind,
+        version=version,
+        items=[ActivityItem.model_validate(link) for link in links],
+        next_cursor=encode_cursor([links[-1].id]) if has_more else None,
+    )
+
+def activity_query(link_model, user_id: int, limit: int, before_id: Optional[int] = None) -> Select:
+    # (user_id, id) index: the page is read in index order, most recent link first
+    query = (
+        select(link_model)
+        .options(joinedload(link_model.job).load_only(Job.id, Job.title, Job.company))
+        .where(link_model.user_id == user_id)
+        .order_by(link_model.id.desc())
+        .limit(limit)
+    )
+    if before_id is not None:
+        query = query.where(link_model.id < before_id)
+    return query
 
 @router.post("/forgot-password")
-async def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    user = db.query(DBUser).filter(DBUser.email == request.email).first()
+async def forgot_password(request: ForgotPasswordRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(DBUser).where(DBUser.email == request.email))
 
     # Security: not reveal if email exists or not
     if user:
@@ -80,7 +136,7 @@ async def forgot_password(request: ForgotPasswordRequest, background_tasks: Back
         user.reset_password_token = reset_token
         user.reset_password_expires_at = expires
         db.add(user)
-        db.commit()
+        await db.commit()
 
         reset_link = f"{settings.FRONTEND_URL}/auth/reset-password?token={reset_token}"
         background_tasks.add_task(send_simple_message, user.email, "Réinitialisation de votre mot de passe", f"Cliquez sur ce lien pour réinitialiser votre mot de passe: {reset_link}")
@@ -88,7 +144,7 @@ async def forgot_password(request: ForgotPasswordRequest, background_tasks: Back
     return print(colorText("Si l'email est enregistré, un lien de réinitialisation a été envoyé.", "vert_fonce"))
 
 @router.post("/reset-password")
-async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_db)):
     try:
         payload = jwt.decode(request.token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
         email: Optional[str] = payload.get("sub")
@@ -104,23 +160,24 @@ async def reset_password(request: ResetPasswordRequest, db: Session = Depends(ge
     except jwt.JWTError:
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Jeton invalide")
 
-    user = db.query(DBUser).filter(DBUser.email == email).first()
+    user = await db.scalar(select(DBUser).where(DBUser.email == email))
 
     # check the token in db matches
     if not user or user.reset_password_token != request.token or user.reset_password_expires_at < datetime.now():
         raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Jeton invalide ou expiré")
     
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = await get_password_hash(request.new_password)
+    revoke_user_tokens(user)
     user.reset_password_token = None
     user.reset_password_expires_at = None
     db.add(user)
-    db.commit()
+    await db.commit()
 
     return print(colorText("Mot de passe réinitialisé avec succès.", "vert_fonce"))
 
 
-def get_user_by_id(user_id: int, db: Session = Depends(get_db)) -> UserResponse | None:
-    db_user = db.query(DBUser).filter(DBUser.id == user_id).first()
+async def get_user_by_id(user_id: int, db: AsyncSession = Depends(get_db)) -> UserResponse | None:
+    db_user = await db.scalar(select(DBUser).options(*USER_JOBS_OPTIONS).where(DBUser.id == user_id))
     if not db_user:
         return None
     return UserResponse.model_validate(db_user)
@@ -1,17 +1,27 @@
 from datetime import date, datetime
-from auth.authentication import get_current_user
-from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import List, Dict, Any
-from auth.schemas import FavoriteJobRequest, JobBase, UserResponse
+from auth.authentication import get_current_user, user_state_etag
+from fastapi import APIRouter, Body, Depends, Query, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Set, Union
+from auth.schemas import (
+    FavoriteJobRequest, ImportRunResponse, InteractionBatchResponse, InteractionEvent, InteractionResult,
+    JobBase, UserJobChange, UserResponse,
+)
 from utils.colorText import colorText
 from services.job_aggregator import JobAggregator
-from models.models import Job, LikedJob, SeenJob, AppliedJob, User
+from services import import_runner, job_recommender, job_search, job_sources, response_cache, seen_buffer
+from models.models import ImportRun, Job, LikedJob, SeenJob, AppliedJob, User
 from pydantic import BaseModel, ConfigDict, field_validator, ValidationError
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import Select, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import dialect_insert, get_db
 import asyncio
-from starlette.status import HTTP_404_NOT_FOUND
+import orjson
+import zlib
+from starlette.status import HTTP_202_ACCEPTED, HTTP_404_NOT_FOUND
 from core.config import settings
+from utils.cursor import decode_cursor, encode_cursor
 
 
 router = APIRouter(
@@ -38,186 +48,515 @@ class JobResponse(JobBase):
             except ValueError:
                 return v
         return str(v)
-    
+
+
+class JobPage(BaseModel):
+    items: List[JobResponse]
+    next_cursor: Optional[str] = None # None on the last page
+
+
+class JobListItem(JobResponse):
+    # the listing sends the start of the description, GET /jobs/{id} has the full text
+    description_truncated: bool = False
+
+
+class JobListPage(BaseModel):
+    items: List[JobListItem]
+    next_cursor: Optional[str] = None # None on the last page
+
+
+def _decode_job_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        date_creation, job_id = decode_cursor(cursor)
+        return datetime.fromisoformat(date_creation), int(job_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _job_list_item(row) -> Dict[str, Any]:
+    # built straight from the selected columns (JobListItem shape), no model validation per row;
+    # orjson writes dateCreation in ISO format like the JobResponse serialisation
+    description = row.description or ""
+    truncated = len(description) > settings.JOB_LIST_DESCRIPTION_LENGTH
+    return {
+        "id": row.id,
+        "external_id": row.external_id,
+        "title": row.title,
+        "company": row.company,
+        "url": row.url,
+        "source": row.source,
+        "location": row.location,
+        "salary": row.salary,
+        "description": description[:settings.JOB_LIST_DESCRIPTION_LENGTH] if truncated else description,
+        "description_truncated": truncated,
+        "typeContrat": row.typeContrat,
+        "dateCreation": row.dateCreation,
+        "liked": row.liked,
+    }
+
+
+def _job_page(rows: List[Any], limit: int) -> Dict[str, Any]:
+    # one extra row was requested to know whether another page exists
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor([rows[-1].dateCreation.isoformat(), rows[-1].id]) if has_more else None
+    return {"items": [_job_list_item(row) for row in rows], "next_cursor": next_cursor}
+
 
 ###################
 ###### ROUTES ######
 
-@router.get("/", response_model=List[JobResponse])
+@router.get("/", response_model=JobListPage)
 async def get_jobs(
-    offset: int = Query(0, ge=0),
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     limit: int = Query(settings.JOB_LIMIT, ge=1, le=100),
-    db: Session = Depends(get_db)
+    source: Optional[str] = Query(None),
+    typeContrat: Optional[str] = Query(None),
+    location: Optional[str] = Query(None, description="case-insensitive prefix"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    db: AsyncSession = Depends(get_db)
 ):
-    jobs_from_db = JobAggregator.get_jobs_from_db(offset=offset, limit=limit, db=db)
-    print(colorText(f"{len(jobs_from_db)} jobs found.", 'vert_fonce'))
-    return [JobResponse.model_validate(job) for job in jobs_from_db]
+    after = _decode_job_cursor(cursor)
+
+    async def build_page() -> Dict[str, Any]:
+        jobs_from_db = await JobAggregator.get_jobs_from_db(
+            limit=limit + 1,
+            db=db,
+            after=after,
+            source=source,
+            typeContrat=typeContrat,
+            location=location,
+            date_from=date_from,
+            date_to=date_to,
+        )
+        print(colorText(f"{len(jobs_from_db)} jobs found.", 'vert_fonce'))
+        return _job_page(jobs_from_db, limit)
+
+    key = response_cache.cache_key("jobs", {
+        "cursor": cursor,
+        "limit": limit,
+        "source": source,
+        "typeContrat": typeContrat,
+        "location": location.lower() if location else None,
+        "date_from": date_from,
+        "date_to": date_to,
+    })
+    return await response_cache.cached_json_response(request, key, build_page)
+
+@router.get("/feed", response_model=JobListPage)
+async def get_feed(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(settings.JOB_LIMIT, ge=1, le=100),
+    source: Optional[str] = Query(None),
+    typeContrat: Optional[str] = Query(None),
+    location: Optional[str] = Query(None, description="case-insensitive prefix"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Les offres de GET /jobs/ sans celles que l'utilisateur a déjà vues ou candidatées, même pagination par clé.
+    """
+    # per user, so not in the response cache; the views still in the write-behind buffer are excluded too
+    query = JobAggregator.feed_page_query(
+        current_user.id,
+        limit + 1,
+        _decode_job_cursor(cursor),
+        source=source,
+        typeContrat=typeContrat,
+        location=location,
+        date_from=date_from,
+        date_to=date_to,
+        exclude_ids=await seen_buffer.pending_job_ids(current_user.id),
+    )
+    return _job_page(list(await db.execute(query)), limit)
+
+@router.get("/recommendations", response_model=List[JobResponse])
+async def get_recommendations(
+    limit: int = Query(settings.JOB_LIMIT, ge=1, le=100),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Offres proches de celles que l'utilisateur a aimées (services/job_recommender.py), jamais vues ni candidatées.
+    """
+    jobs = await job_recommender.recommend(db, current_user.id, limit, await seen_buffer.pending_job_ids(current_user.id))
+    return _to_job_responses(jobs, "recommended")
+
+@router.get("/search", response_model=JobPage)
+async def search_jobs(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(settings.JOB_LIMIT, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    after = None
+    if cursor is not None:
+        try:
+            score, job_id = decode_cursor(cursor)
+            after = (float(score), int(job_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    results = await job_search.search_jobs(db, q, limit=limit + 1, after=after)
+    print(colorText(f"{len(results)} jobs found for '{q}'.", 'vert_fonce'))
+
+    has_more = len(results) > limit
+    results = results[:limit]
+    next_cursor = encode_cursor([results[-1][1], results[-1][0].id]) if has_more else None
+    return JobPage(items=[JobResponse.model_validate(job) for job, _ in results], next_cursor=next_cursor)
+
+async def _export_lines(rows: AsyncIterator[List[Any]], gzip: bool) -> AsyncIterator[bytes]:
+    # one JSON document per line, one chunk per batch of rows: memory stays bounded by the batch size
+    compressor = zlib.compressobj(wbits=31) if gzip else None # 31: gzip container
+    async for batch in rows:
+        chunk = b"".join(orjson.dumps(row._asdict()) + b"\n" for row in batch)
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+    if compressor is not None:
+        yield compressor.flush()
+
+
+@router.get("/export")
+async def export_jobs(
+    source: Optional[str] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    gzip: bool = Query(False, description="gzip the NDJSON stream (jobs.ndjson.gz)"),
+):
+    rows = JobAggregator.iter_jobs_export(source=source, date_from=date_from, date_to=date_to)
+    filename = "jobs.ndjson.gz" if gzip else "jobs.ndjson"
+    return StreamingResponse(
+        _export_lines(rows, gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/import", status_code=HTTP_202_ACCEPTED)
+async def import_jobs(
+    source: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_db),
+):
+    unknown_sources = set(source or []) - set(job_sources.enabled_sources())
+    if unknown_sources:
+        raise HTTPException(status_code=400, detail=f"Unknown source(s): {', '.join(sorted(unknown_sources))}")
 
-@router.post("/import")
-async def import_jobs(db: Session = Depends(get_db)):
-    await JobAggregator.aggregate_jobs(db)
-    return {"message": "Job import initiated successfully."}
+    run, started = await import_runner.start_import(db, source)
+    if not started:
+        if run is None:
+            # started by another worker, which has not saved its run yet
+            return {"message": "Job import already running.", "run_id": None, "status": "pending"}
+        print(colorText(f"Import {run.id} already running.", 'jaune'))
+        return {"message": "Job import already running.", "run_id": run.id, "status": run.status}
+    return {"message": "Job import initiated successfully.", "run_id": run.id, "status": run.status}
 
 
-@router.get("/{id}", response_model=JobResponse)
-async def get_job_by_id(id: int, db: Session = Depends(get_db)):
-    job_in_db = db.query(Job).filter(Job.id == id).first()
+@router.get("/import/{run_id}", response_model=ImportRunResponse)
+async def get_import_run(run_id: str, db: AsyncSession = Depends(get_db)):
+    run = await db.get(ImportRun, run_id)
+    if not run:
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Import run not found")
+    return run
 
-    if not job_in_db:
-        print(colorText(f'no job exists with id {id}', 'rouge'))
+
+@router.get("/{id}", response_model=JobResponse)
+async def get_job_by_id(id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def build_job() -> JobResponse:
+        job_in_db = await db.get(Job, id)
+
+        if not job_in_db:
+            print(colorText(f'no job exists with id {id}', 'rouge'))
+            raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
+
+        print(colorText(f'job {id} successfully found', 'vert_fonce'))
+        return JobResponse.model_validate(job_in_db)
+
+    return await response_cache.cached_json_response(request, response_cache.cache_key("job", {"id": id}), build_job)
+
+
+async def _bump_state_version(db: AsyncSession, user_id: int) -> int:
+    return (await db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(state_version=User.state_version + 1)
+        .returning(User.state_version)
+    )).scalar_one()
+
+
+async def _add_user_job(db: AsyncSession, link_model, user_id: int, job_id: int, already_detail: str) -> int:
+    """
+    Ajoute le lien (user_id, job_id) et renvoie la nouvelle version de l'état de l'utilisateur.
+    """
+    # the (user_id, job_id) unique constraint replaces the existence checks: one INSERT ... ON CONFLICT DO NOTHING
+    stmt = (
+        dialect_insert(db, link_model.__table__)
+        .values(user_id=user_id, job_id=job_id)
+        .on_conflict_do_nothing(index_elements=["user_id", "job_id"])
+        .returning(link_model.id)
+    )
+    try:
+        inserted = (await db.execute(stmt)).first()
+    except IntegrityError:
+        # foreign key violation: the job does not exist
+        await db.rollback()
+        print(colorText(f"No job exists with id {job_id}", 'rouge'))
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
 
-    print(colorText(f'job {id} successfully found', 'vert_fonce'))
-    return JobResponse.model_validate(job_in_db)
+    if inserted is None:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=already_detail)
 
+    if link_model is LikedJob:
+        await job_recommender.rebuild_profile(db, user_id)
+    version = await _bump_state_version(db, user_id)
+    await db.commit()
+    return version
+
+
+async def _user_job_response(db: AsyncSession, response: Response, compact: bool, user_id: int, job_id: int, kind: str, action: str, version: int):
+    response.headers["ETag"] = user_state_etag(user_id, version)
+    if compact:
+        return UserJobChange(user_id=user_id, job_id=job_id, kind=kind, action=action, version=version)
 
-@router.post("/liked-jobs", response_model=UserResponse)
-async def like_job(
-    payload: FavoriteJobRequest,
-    current_user=Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
     from routers.auth import get_user_by_id
+    return await get_user_by_id(user_id, db)
 
-    # 1. Check if job is already liked by the user
-    already_liked = db.query(LikedJob).filter_by(
-        user_id=current_user.id,
-        job_id=payload.job_id
-    ).first()
-
-    if already_liked:
-        raise HTTPException(status_code=409, detail="Job already liked")
-    # 2. Try to find the job in DB
-    job_in_db = db.query(Job).filter_by(id=payload.job_id).first()
-    # 3. If not found, fetch from aggregator
-    if not job_in_db:
-        print(colorText(f"No job exists with id {payload.job_id}", 'rouge'))
-        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
 
-    # 4. Like the job
-    liked_job = LikedJob(user_id=current_user.id, job_id=payload.job_id)
-    db.add(liked_job)
-    db.commit()
+async def _get_user_jobs(db: AsyncSession, link_model, user_id: int, offset: int, limit: Optional[int]) -> List[Job]:
+    return list(await db.scalars(user_jobs_query(link_model, user_id, offset, limit)))
 
-    return get_user_by_id(current_user.id, db)
 
+def user_jobs_query(link_model, user_id: int, offset: int, limit: Optional[int]) -> Select:
+    # single query: jobs joined to the user's links, most recent link first
+    query = (
+        select(Job)
+        .join(link_model, link_model.job_id == Job.id)
+        .where(link_model.user_id == user_id)
+        .order_by(link_model.id.desc())
+        .offset(offset)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
 
-@router.delete("/liked-jobs/{job_id}", response_model=UserResponse)
-async def unlike_job(job_id: int, user_id: int = Query(...), db: Session = Depends(get_db)):
-    from routers.auth import get_user_by_id
-    
-    liked = db.query(LikedJob).filter_by(user_id=user_id, job_id=job_id).first()
-    if not liked:
+
+def _to_job_responses(jobs: List[Job], kind: str) -> List[JobResponse]:
+    responses: List[JobResponse] = []
+    for job in jobs:
+        try:
+            responses.append(JobResponse.model_validate(job))
+        except ValidationError as e:
+            print(colorText(f"Validation Error for {kind} job {job.id}: {e}", 'rouge'))
+    return responses
+
+
+@router.post("/liked-jobs", response_model=Union[UserResponse, UserJobChange])
+async def like_job(
+    payload: FavoriteJobRequest,
+    response: Response,
+    compact: bool = Query(False, description="only return the change and the new state version"),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    version = await _add_user_job(db, LikedJob, current_user.id, payload.job_id, "Job already liked")
+    return await _user_job_response(db, response, compact, current_user.id, payload.job_id, "liked", "added", version)
+
+
+@router.delete("/liked-jobs/{job_id}", response_model=Union[UserResponse, UserJobChange])
+async def unlike_job(
+    job_id: int,
+    response: Response,
+    compact: bool = Query(False, description="only return the change and the new state version"),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    user_id = current_user.id
+    result = await db.execute(delete(LikedJob).where(LikedJob.user_id == user_id, LikedJob.job_id == job_id))
+    if result.rowcount == 0:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Like not found")
 
-    db.delete(liked)
-    db.commit()
-    return get_user_by_id(user_id, db)
+    await job_recommender.rebuild_profile(db, user_id)
+    version = await _bump_state_version(db, user_id)
+    await db.commit()
+    return await _user_job_response(db, response, compact, user_id, job_id, "liked", "removed", version)
 
 @router.get("/liked-jobs/{user_id}", response_model=List[JobResponse])
-async def get_liked_jobs(user_id: int, db: Session = Depends(get_db)):
-    liked_jobs = db.query(LikedJob).filter_by(user_id=user_id).all()
-    jobs: List[JobResponse] = []
-    
-    for liked in liked_jobs:
-        job = db.query(Job).filter_by(id=liked.job_id).first()
-        if job:
-            try:
-                jobs.append(JobResponse.model_validate(job))
-            except ValidationError as e:
-                print(colorText(f"Validation Error for liked job {job.id}: {e}", 'rouge'))
-    return jobs
+async def get_liked_jobs(
+    user_id: int,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    return _to_job_responses(await _get_user_jobs(db, LikedJob, user_id, offset, limit), "liked")
 
 ## SEEN JOBS ##
-@router.post("/{user_id}/seen-jobs", response_model = UserResponse)
+@router.post("/{user_id}/seen-jobs", response_model=Union[UserResponse, UserJobChange])
 async def see_job(
     payload: FavoriteJobRequest,
+    response: Response,
+    compact: bool = Query(False, description="only return the change and the new state version"),
     current_user=Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    from routers.auth import get_user_by_id
-
-    # 1. check if job is already seen
-    already_seen = db.query(SeenJob).filter_by(
-        user_id=current_user.id,
-        job_id=payload.job_id,
-    ).first()
-
-    if already_seen:
+    if await seen_buffer.is_pending(current_user.id, payload.job_id):
         raise HTTPException(status_code=409, detail="Job already seen")
-    # 2. try to find job in DB
-    job_in_db = db.query(Job).filter_by(id=payload.job_id).first()
-
-    # 3. if not in DB, fetch from aggregator
-    if not job_in_db:
+    if not compact:
+        # the full user is rebuilt from the base: written now
+        version = await _add_user_job(db, SeenJob, current_user.id, payload.job_id, "Job already seen")
+        return await _user_job_response(db, response, compact, current_user.id, payload.job_id, "seen", "added", version)
+
+    # one read for the job, the existing view and the state version; the write goes to the seen buffer
+    row = (await db.execute(see_job_query(current_user.id, payload.job_id))).first()
+    if row is None:
         print(colorText(f"No job exists with id {payload.job_id}", 'rouge'))
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
+    if row[0] is not None or not await seen_buffer.add(current_user.id, payload.job_id):
+        raise HTTPException(status_code=409, detail="Job already seen")
+    # version of the state before the flush, which bumps it once the view is written
+    return await _user_job_response(db, response, compact, current_user.id, payload.job_id, "seen", "added", row[1])
 
-    # 4. "See" the job
-    seen_job = SeenJob(user_id=current_user.id, job_id=payload.job_id)
-    db.add(seen_job)
-    db.commit()
 
-    return get_user_by_id(current_user.id, db)
+def see_job_query(user_id: int, job_id: int) -> Select:
+    # (existing view id or None, state version), no row when the job doesn't exist
+    return (
+        select(SeenJob.id, select(User.state_version).where(User.id == user_id).scalar_subquery())
+        .select_from(Job)
+        .outerjoin(SeenJob, (SeenJob.job_id == Job.id) & (SeenJob.user_id == user_id))
+        .where(Job.id == job_id)
+    )
 
-@router.get("/seen-jobs/{user_id}", response_model=List[JobResponse])
-async def get_seen_jobs(user_id: int, db: Session = Depends(get_db)):
-    seen_jobs = db.query(SeenJob).filter_by(user_id=user_id).all()
-    jobs: List[JobResponse] = []
 
-    for seen in seen_jobs:
-        job = db.query(Job).filter_by(id=seen.job_id).first()
-        if job:
-            try:
-                jobs.append(JobResponse.model_validate(job))
-            except ValidationError as e:
-                print(colorText(f"Validation Error for seen job {job.id}: {e}", 'rouge'))
-    return jobs
+@router.get("/seen-jobs/{user_id}", response_model=List[JobResponse])
+async def get_seen_jobs(
+    user_id: int,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    # views still in the write-behind buffer are the most recent ones: listed first
+    pending_ids = await seen_buffer.pending_job_ids(user_id)
+    overlay_ids = pending_ids[offset:offset + limit if limit is not None else None]
+    jobs: List[Job] = []
+    if overlay_ids:
+        by_id = {job.id: job for job in await db.scalars(select(Job).where(Job.id.in_(overlay_ids)))}
+        jobs = [by_id[job_id] for job_id in overlay_ids if job_id in by_id]
+
+    remaining = None if limit is None else limit - len(overlay_ids)
+    if remaining is None or remaining > 0:
+        stored = await _get_user_jobs(db, SeenJob, user_id, max(0, offset - len(pending_ids)), remaining)
+        # a view being flushed can be in both for a moment
+        overlay = set(pending_ids)
+        jobs.extend(job for job in stored if job.id not in overlay)
+    return _to_job_responses(jobs, "seen")
 
 ## APPLIED JOBS ##
-@router.post("/{user_id}/apply-jobs", response_model = UserResponse)
+@router.post("/{user_id}/apply-jobs", response_model=Union[UserResponse, UserJobChange])
 async def apply_job(
     payload: FavoriteJobRequest,
+    response: Response,
+    compact: bool = Query(False, description="only return the change and the new state version"),
     current_user=Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    from routers.auth import get_user_by_id
-
-    # 1. check if job is already applied
-    already_applied = db.query(SeenJob).filter_by(
-        user_id=current_user.id,
-        job_id=payload.job_id,
-    ).first()
+    version = await _add_user_job(db, AppliedJob, current_user.id, payload.job_id, "Job already applied")
+    return await _user_job_response(db, response, compact, current_user.id, payload.job_id, "applied", "added", version)
 
-    if already_applied:
-        raise HTTPException(status_code=409, detail="Job already applied")
 
-    # 2. try to find job in DB
-    job_in_db = db.query(Job).filter_by(id=payload.job_id).first()
-
-    # 3. if not in DB, fetch from aggregator
-    if not job_in_db:
-        print(colorText(f"No job exists with id {payload.job_id}", 'rouge'))
-        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
+@router.get("/applied-jobs/{user_id}", response_model=List[JobResponse])
+async def get_applied_jobs(
+    user_id: int,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+):
+    return _to_job_responses(await _get_user_jobs(db, AppliedJob, user_id, offset, limit), "applied")
 
-    # 4. "Apply" the job
-    applied_job = SeenJob(user_id=current_user.id, job_id=payload.job_id)
-    db.add(applied_job)
-    db.commit()
 
-    return get_user_by_id(current_user.id, db)
+## INTERACTIONS ##
+INTERACTION_MODELS = {"liked": LikedJob, "seen": SeenJob, "applied": AppliedJob}
 
 
-@router.get("/applied-jobs/{user_id}", response_model=List[JobResponse])
-async def get_applied_jobs(user_id: int, db: Session = Depends(get_db)):
-    applied_jobs = db.query(SeenJob).filter_by(user_id=user_id).all()
-    jobs: List[JobResponse] = []
+@router.post("/interactions:batch", response_model=InteractionBatchResponse)
+async def add_interactions(
+    response: Response,
+    events: List[InteractionEvent] = Body(..., max_length=settings.INTERACTION_BATCH_MAX_EVENTS),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Enregistre un lot de likes / vues / candidatures en une transaction : un SELECT pour les offres,
+    un INSERT ... ON CONFLICT DO NOTHING par type d'événement et une seule nouvelle version de l'état.
+    Les vues passent par le tampon d'écriture (seen_buffer), écrites avec celles des autres requêtes.
+    """
+    user_id = current_user.id
+    job_ids = {event.job_id for event in events}
+    existing = set(await db.scalars(existing_jobs_query(job_ids))) if job_ids else set()
+
+    # (kind -> job ids) in the order of the events, each pair once
+    pending: Dict[str, Dict[int, None]] = {}
+    for event in events:
+        if event.job_id in existing:
+            pending.setdefault(event.kind, {})[event.job_id] = None
+
+    # seen jobs go to the write-behind buffer once the other events are committed
+    seen_ids = pending.pop("seen", {})
+    already_seen = set(await db.scalars(seen_job_ids_query(user_id, seen_ids))) if seen_ids else set()
+
+    added: Dict[str, Set[int]] = {}
+    try:
+        for kind, kind_job_ids in pending.items():
+            link_model = INTERACTION_MODELS[kind]
+            stmt = (
+                dialect_insert(db, link_model.__table__)
+                .values([{"user_id": user_id, "job_id": job_id} for job_id in kind_job_ids])
+                .on_conflict_do_nothing(index_elements=["user_id", "job_id"])
+                .returning(link_model.job_id)
+            )
+            added[kind] = set((await db.execute(stmt)).scalars())
+    except IntegrityError:
+        # a job deleted between the SELECT and the INSERT
+        await db.rollback()
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Job not found")
 
-    for applied in applied_jobs:
-        job = db.query(Job).filter_by(id=applied.job_id).first()
-        if job:
-            try:
-                jobs.append(JobResponse.model_validate(job))
-            except ValidationError as e:
-                print(colorText(f"Validation Error for applied job {job.id}: {e}", 'rouge'))
-    return jobs
+    if any(added.values()):
+        if added.get("liked"):
+            await job_recommender.rebuild_profile(db, user_id)
+        version = await _bump_state_version(db, user_id)
+        await db.commit()
+    else:
+        await db.rollback()
+        version = (await db.execute(select(User.state_version).where(User.id == user_id))).scalar_one()
+    added["seen"] = {
+        job_id for job_id in seen_ids if job_id not in already_seen and await seen_buffer.add(user_id, job_id)
+    }
+
+    results: List[InteractionResult] = []
+    for event in events:
+        if event.job_id not in existing:
+            status = "not_found"
+        elif event.job_id in added.get(event.kind, ()):
+            # only the first event of a (kind, job_id) pair counts as added
+            added[event.kind].discard(event.job_id)
+            status = "added"
+        else:
+            status = "duplicate"
+        results.append(InteractionResult(job_id=event.job_id, kind=event.kind, status=status))
+
+    response.headers["ETag"] = user_state_etag(user_id, version)
+    return InteractionBatchResponse(user_id=user_id, version=version, results=results)
+
+
+def existing_jobs_query(job_ids: Set[int]) -> Select:
+    return select(Job.id).where(Job.id.in_(job_ids))
+
+
+def seen_job_ids_query(user_id: int, job_ids: Iterable[int]) -> Select:
+    return select(SeenJob.job_id).where(SeenJob.user_id == user_id, SeenJob.job_id.in_(job_ids))
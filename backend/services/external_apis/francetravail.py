@@ -1,11 +1,20 @@
-import requests
+import asyncio
+import httpx
 import time
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 from models.models import Job
 from core.config import settings
 from auth.schemas import JobBase, JobResponse
 from utils.colorText import colorText
+from services import http_client, job_sources
+from services.job_sources import SourceClient, SourcePolicy
+
+# codes accepted by the `departement` search parameter, used to split searches over the result cap
+DEPARTEMENTS = (
+    [f"{n:02d}" for n in range(1, 96) if n != 20]
+    + ["2A", "2B", "971", "972", "973", "974", "976"]
+)
 
 _francetravail_token_cache = {
     "access_token": None,
@@ -33,8 +42,7 @@ async def get_francetravail_access_token():
     )
 
     try:
-        response = requests.post(settings.FRANCETRAVAIL_TOKEN_URL, headers=headers, data=payload)
-        response.raise_for_status()
+        response = await http_client.request("POST", settings.FRANCETRAVAIL_TOKEN_URL, headers=headers, content=payload)
         token_data = response.json()
 
         access_token = token_data.get("access_token")
@@ -48,61 +56,199 @@ async def get_francetravail_access_token():
         else:
             print(f"Erreur: 'access_token' non trouvé dans la réponse du token France Travail: {token_data}")
             return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Erreur lors de l'obtention du token France Travail: {e}")
-        if e.response is not None:
+        if isinstance(e, httpx.HTTPStatusError):
             print(f"Réponse d'erreur: {e.response.status_code} - {e.response.text}")
         return None
 
+class FranceTravailError(Exception):
+    pass
+
+@job_sources.register
 class FranceTravailService:
+    SOURCE = "France Travail"
+    POLICY = SourcePolicy(
+        rate_limit=settings.FRANCETRAVAIL_RATE_LIMIT,
+        concurrency=settings.FRANCETRAVAIL_CONCURRENCY,
+        time_budget=settings.FRANCETRAVAIL_TIME_BUDGET,
+    )
+    SKIP_KNOWN_IDS = False
+
     @staticmethod
-    async def fetch_jobs() -> List[JobBase]:
+    def is_enabled() -> bool:
+        return True
+
+    @staticmethod
+    async def iter_jobs(client: SourceClient, since: Optional[datetime], known_ids: Set[str]) -> AsyncIterator[List[dict]]:
+        """
+        Parcourt toutes les pages de résultats (paramètre `range`) et renvoie chaque page d'offres brutes
+        dès qu'elle arrive (voir to_job).
+        Les recherches au-delà du plafond de l'API sont découpées par département puis par fenêtre de dateCreation.
+        Avec `since`, seules les offres créées depuis cette date sont demandées (minCreationDate).
+        Lève FranceTravailError si le token ou une page n'a pas pu être récupéré, CircuitOpenError si l'API est coupée.
+        """
         access_token = await get_francetravail_access_token()
         if not access_token:
-            print("Impossible d'obtenir le token France Travail, étape suivante.")
-            return []
+            raise FranceTravailError("Impossible d'obtenir le token France Travail, étape suivante.")
+
+        print(colorText(f"France Travail env actuel (pour motsClés): {settings.ENV}.", "bleu"))
+        params = {
+            "accesTravailleurHandicape": "false",
+            "motsCles": "" if settings.ENV == "prod" else "développeur",
+        }
+        if since is not None:
+            # the API only accepts minCreationDate together with maxCreationDate
+            params["minCreationDate"] = _format_api_date(since)
+            params["maxCreationDate"] = _format_api_date(datetime.now(timezone.utc))
+
+        harvester = _Harvester(client, access_token)
+        async for batch in harvester.run(params):
+            yield batch
+        if harvester.failures:
+            raise FranceTravailError(f"France Travail: {harvester.failures} pages en échec.")
 
+    @staticmethod
+    def to_job(offre: dict) -> JobBase:
+        date_creation_str = offre.get("dateCreation")
+        date_creation = datetime.fromisoformat(date_creation_str.replace("Z", "+00:00")).date() if date_creation_str else None
+        return JobBase(
+            external_id=str(offre.get("id", "")),
+            title=offre.get("intitule", ""),
+            company=offre.get("entreprise", {}).get("nom", ""),
+            url=offre.get("contact", {}).get("urlPostulation", "") or "",
+            source=FranceTravailService.SOURCE,
+            location=offre.get("lieuTravail", {}).get("libelle", ""),
+            salary=offre.get("salaire", {}).get("libelle", ""),
+            description=offre.get("description", ""),
+            typeContrat=offre.get("typeContrat", ""),
+            dateCreation=date_creation,
+        )
+
+
+class _Harvester:
+    def __init__(self, client: SourceClient, access_token: str):
+        # the client applies the rate limit and the concurrency of FranceTravailService.POLICY
+        self.client = client
+        self.headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Accept": "application/json"
+        }
+        self.pages: asyncio.Queue = asyncio.Queue(maxsize=settings.FRANCETRAVAIL_CONCURRENCY * 2)
+        self.spawned = 0
+        self.failures = 0
+        self.circuit_error: Optional[job_sources.CircuitOpenError] = None
+        self.tasks = set()
+
+    async def run(self, params: Dict[str, str]) -> AsyncIterator[List[dict]]:
+        self._spawn(self._harvest_partition(params))
+        received = 0
         try:
-            params = {
-                "accesTravailleurHandicape": "false",
-                "motsCles":"" if settings.ENV == "prod" else "développeur",
-            }
-            print(settings.ENV)
-            print(colorText(f"France Travail env actuel (pour motsClés): {settings.ENV}.", "bleu"))
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Accept": "application/json"
-            }
-            url = settings.FRANCETRAVAIL_API_URL
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-
-            data = response.json()
-            jobs: List[JobBase] = []
-
-            for offre in data.get("resultats", []):
-                date_creation_str = offre.get("dateCreation")
-                date_creation = datetime.strptime(date_creation_str, "%Y-%m-%dT%H:%M:%S.%fZ").date() if date_creation_str else None
-                job = JobBase(
-                    external_id=str(offre.get("id", "")),
-                    title=offre.get("intitule", ""),
-                    company=offre.get("entreprise", {}).get("nom", ""),
-                    url=offre.get("contact", {}).get("urlPostulation", "") or "",
-                    source="France Travail",
-                    location=offre.get("lieuTravail", {}).get("libelle", ""),
-                    salary=offre.get("salaire", {}).get("libelle", ""),
-                    description=offre.get("description", {}),
-                    typeContrat=offre.get("typeContrat", {}),
-                    dateCreation=date_creation,
-                )
-                jobs.append(job)
-            print(colorText(f"France Travail: {len(jobs)} jobs fetched.", "bleu"))
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching from France Travail: {e}")
-            if e.response is not None:
+            # children are spawned before their parent reports, so this only ends once every page is in
+            while received < self.spawned:
+                batch = await self.pages.get()
+                received += 1
+                if self.circuit_error is not None:
+                    # the upstream is down, the remaining pages would all fail the same way
+                    raise self.circuit_error
+                if batch:
+                    yield batch
+        finally:
+            for task in self.tasks:
+                task.cancel()
+
+    def _spawn(self, coro) -> None:
+        # every task puts exactly one item (possibly None) in the queue when it is done
+        self.spawned += 1
+        task = asyncio.create_task(self._guard(coro))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _guard(self, coro) -> None:
+        batch = None
+        try:
+            batch = await coro
+        except job_sources.CircuitOpenError as e:
+            self.failures += 1
+            self.circuit_error = e
+        except httpx.HTTPError as e:
+            self.failures += 1
+            print(colorText(f"Error fetching from France Travail: {e}", "rouge"))
+            if isinstance(e, httpx.HTTPStatusError):
                 print(f"Response error: {e.response.status_code} - {e.response.text}")
-            return []
         except Exception as e:
-            print(f"Unexpected error fetching from France Travail: {e}")
-            return []
-        return jobs
\ No newline at end of file
+            self.failures += 1
+            print(colorText(f"Unexpected error fetching from France Travail: {e}", "rouge"))
+        await self.pages.put(batch)
+
+    async def _harvest_partition(self, params: Dict[str, str]) -> Optional[List[dict]]:
+        first_page, total = await self._fetch_page(params, 0)
+
+        if total > settings.FRANCETRAVAIL_MAX_RESULTS:
+            sub_partitions = _split(params)
+            if sub_partitions:
+                # the sub-partitions cover this page again, drop it
+                for sub_params in sub_partitions:
+                    self._spawn(self._harvest_partition(sub_params))
+                return None
+            print(colorText(f"France Travail: {total} offres pour {params}, seules les {settings.FRANCETRAVAIL_MAX_RESULTS} premières sont lisibles.", "jaune"))
+
+        last_index = min(total, settings.FRANCETRAVAIL_MAX_RESULTS)
+        for start in range(settings.FRANCETRAVAIL_PAGE_SIZE, last_index, settings.FRANCETRAVAIL_PAGE_SIZE):
+            self._spawn(self._fetch_jobs_page(params, start))
+        return first_page
+
+    async def _fetch_jobs_page(self, params: Dict[str, str], start: int) -> List[dict]:
+        jobs, _ = await self._fetch_page(params, start)
+        return jobs
+
+    async def _fetch_page(self, params: Dict[str, str], start: int) -> Tuple[List[dict], int]:
+        end = min(start + settings.FRANCETRAVAIL_PAGE_SIZE, settings.FRANCETRAVAIL_MAX_RESULTS) - 1
+        response = await self.client.request(
+            "GET",
+            settings.FRANCETRAVAIL_API_URL,
+            headers=self.headers,
+            params={**params, "range": f"{start}-{end}"},
+        )
+        if response.status_code == 204:
+            return [], 0
+
+        data = response.json()
+        offres = data.get("resultats", [])
+        return offres, _total_from_content_range(response.headers.get("Content-Range"), len(offres))
+
+
+def _total_from_content_range(content_range: Optional[str], default: int) -> int:
+    # e.g. "offres 0-149/6245"
+    try:
+        return int(content_range.rsplit("/", 1)[1])
+    except (AttributeError, IndexError, ValueError):
+        return default
+
+
+def _split(params: Dict[str, str]) -> List[Dict[str, str]]:
+    if "departement" not in params:
+        return [{**params, "departement": code} for code in DEPARTEMENTS]
+
+    # then halve the dateCreation window until each part fits under the cap
+    now = datetime.now(timezone.utc)
+    window_start = _parse_api_date(params.get("minCreationDate")) or now - timedelta(days=settings.FRANCETRAVAIL_MAX_AGE_DAYS)
+    window_end = _parse_api_date(params.get("maxCreationDate")) or now
+    if window_end - window_start <= timedelta(hours=1):
+        return []
+    middle = window_start + (window_end - window_start) / 2
+    return [
+        {**params, "minCreationDate": _format_api_date(window_start), "maxCreationDate": _format_api_date(middle)},
+        {**params, "minCreationDate": _format_api_date(middle), "maxCreationDate": _format_api_date(window_end)},
+    ]
+
+
+def _format_api_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_api_date(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc) if value else None
+
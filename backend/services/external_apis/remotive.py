@@ -1,37 +1,76 @@
 from datetime import datetime
-import requests
-from typing import List
+import ijson
+from typing import AsyncIterator, List, Optional, Set
 from utils.colorText import colorText
 from models.models import Job
 from core.config import settings
 from auth.schemas import JobBase, JobResponse
+from services import http_client, job_sources
+from services.job_sources import SourceClient, SourcePolicy
 
+@job_sources.register
 class RemotiveService:
+    SOURCE = "Remotive"
+    POLICY = SourcePolicy(rate_limit=settings.REMOTIVE_RATE_LIMIT, time_budget=settings.REMOTIVE_TIME_BUDGET)
+    SKIP_KNOWN_IDS = True
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return True
+
+    @staticmethod
+    async def iter_jobs(client: SourceClient, since: Optional[datetime], known_ids: Set[str]) -> AsyncIterator[List[dict]]:
+        """
+        Remotive n'a pas de filtre par date : le flux est lu au fil de l'eau et les offres dont l'external_id
+        est déjà connu sont écartées. Renvoie les offres brutes par lots (voir to_job).
+        Lève httpx.HTTPError ou ValueError en cas d'échec.
+        """
+        batch: List[dict] = []
+        count = 0
+        async for job in RemotiveService._iter_offers(client, known_ids, since):
+            batch.append(job)
+            count += 1
+            if len(batch) >= settings.IMPORT_CHUNK_SIZE:
+                yield batch
+                batch = []
+        print(colorText(f"Remotive: {count} new jobs fetched.", 'vert_fonce'))
+        if batch:
+            yield batch
+
     @staticmethod
-    def fetch_jobs() -> List[JobBase]:
-        jobs: List[JobBase] = []
-        try:
-            response = requests.get(settings.JOBBOARD_URL)
-            response.raise_for_status()
-            data = response.json()
-            jobs = [
-                JobBase(
-                    external_id=str(job['id']),
-                    title=job.get("title", ""),
-                    company=job.get("company_name", ""),
-                    url=job.get("url", ""),
-                    source="Remotive",
-                    location=job.get("candidate_required_location", ""),
-                    salary=job.get("salary", ""),
-                    description=job.get("description", ""),
-                    typeContrat=job.get("job_type", ""),
-                    dateCreation=datetime.strptime(job.get("publication_date", ""), "%Y-%m-%dT%H:%M:%S.%fZ").date(),
-                )
-                for job in data.get("jobs", [])[:settings.JOB_LIMIT]
-            ]
-            print(colorText(f"Remotive: {len(jobs)} jobs fetched.", 'vert_fonce'))
-        except requests.exceptions.RequestException as e:
-            print(colorText(f"Error fetching from Remotive: {e}", 'rouge'))
-        except ValueError as e:
-            print(colorText(f"Date parsing error from Remotive: {e}", 'rouge'))
-        return jobs
+    async def _iter_offers(client: SourceClient, known_ids: Set[str], since: Optional[datetime]) -> AsyncIterator[dict]:
+        # each offer is parsed as soon as its JSON object is complete, the rest of the feed is never downloaded
+        # once JOB_LIMIT new offers are read or the feed (newest first) goes past the watermark
+        count = 0
+        async with client.stream("GET", settings.JOBBOARD_URL) as response:
+            async for offer in ijson.items(http_client.AsyncBodyReader(response), "jobs.item", use_float=True):
+                if str(offer['id']) in known_ids:
+                    continue
+                if since is not None and _publication_date(offer) < since:
+                    break
+                yield offer
+                count += 1
+                if count >= settings.JOB_LIMIT:
+                    break
+
+    @staticmethod
+    def to_job(job: dict) -> JobBase:
+        return JobBase(
+            external_id=str(job['id']),
+            title=job.get("title", ""),
+            company=job.get("company_name", ""),
+            url=job.get("url", ""),
+            source=RemotiveService.SOURCE,
+            location=job.get("candidate_required_location", ""),
+            salary=job.get("salary", ""),
+            description=job.get("description", ""),
+            typeContrat=job.get("job_type", ""),
+            dateCreation=_publication_date(job),
+        )
+
+
+def _publication_date(job: dict) -> datetime:
+    # day of publication, like the dateCreation stored for the other sources
+    date = datetime.strptime(job.get("publication_date", ""), "%Y-%m-%dT%H:%M:%S.%fZ").date()
+    return datetime(date.year, date.month, date.day)
+
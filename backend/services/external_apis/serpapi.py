@@ -1,36 +1,89 @@
-# import requests
-# from typing import List
-# from models.models import Job
-# from core.config import settings
-
-# class SerpAPIService:
-#     @staticmethod
-#     def fetch_jobs() -> List[Job]:
-#         try:
-#             if not settings.SERP_API_KEY:
-#                 print("SERP_API_KEY not set, skipping SerpAPI job fetch.")
-#                 return []
-
-#             params = {
-#                 "engine": "google_jobs",
-#                 "q": "remote developer",
-#                 "api_key": settings.SERP_API_KEY,
-#                 "location": ""
-#             }
-#             response = requests.get(settings.JOBBOARD_URL_SERP, params=params)
-#             response.raise_for_status()
-#             data = response.json()
-#             return [
-#                 Job(
-#                     id=job.get("job_id", ""),
-#                     title=job.get("title", ""),
-#                     company=job.get("company_name", ""),
-#                     url=job.get("related_links", [{}])[0].get("link", "") or job.get("url", ""), # Fallback for URL
-#                     source="SerpAPI",
-#                     location=job.get("location", ""),
-#                 )
-#                 for job in data.get("jobs_results", [])[:10] # Limiting for example
-#             ]
-#         except requests.exceptions.RequestException as e:
-#             print(f"Error fetching from SerpAPI: {e}")
-#         return []
\ No newline at end of file
+import re
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Set
+from core.config import settings
+from auth.schemas import JobBase
+from services import job_sources
+from services.job_sources import SourceClient, SourcePolicy
+
+# "posted_at" of Google Jobs is relative: "3 days ago", "12 hours ago"...
+POSTED_AT_PATTERN = re.compile(r"(\d+)\s+(minute|hour|day|week|month)")
+POSTED_AT_UNITS = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=30),
+}
+
+class SerpAPIError(Exception):
+    pass
+
+@job_sources.register
+class SerpAPIService:
+    SOURCE = "SerpAPI"
+    POLICY = SourcePolicy(rate_limit=settings.SERPAPI_RATE_LIMIT, time_budget=settings.SERPAPI_TIME_BUDGET)
+    SKIP_KNOWN_IDS = True
+
+    @staticmethod
+    def is_enabled() -> bool:
+        # each request costs a search credit, the source stays off without a key
+        return bool(settings.SERP_API_KEY)
+
+    @staticmethod
+    async def iter_jobs(client: SourceClient, since: Optional[datetime], known_ids: Set[str]) -> AsyncIterator[List[dict]]:
+        """
+        Recherche Google Jobs, une page (10 offres) par lot, au plus SERPAPI_MAX_PAGES pages.
+        Les résultats sont triés par pertinence et non par date : seules les offres déjà connues sont écartées.
+        Lève httpx.HTTPError ou SerpAPIError en cas d'échec.
+        """
+        params = {
+            "engine": "google_jobs",
+            "q": settings.SERPAPI_QUERY,
+            "api_key": settings.SERP_API_KEY,
+        }
+        if settings.SERPAPI_LOCATION:
+            params["location"] = settings.SERPAPI_LOCATION
+
+        for _ in range(settings.SERPAPI_MAX_PAGES):
+            response = await client.request("GET", settings.JOBBOARD_URL_SERP, params=params)
+            data = response.json()
+            if data.get("error"):
+                # also returned when there is no result at all
+                if "hasn't returned any results" in data["error"]:
+                    return
+                raise SerpAPIError(f"SerpAPI: {data['error']}")
+
+            batch = [offer for offer in data.get("jobs_results", []) if offer.get("job_id") not in known_ids]
+            if batch:
+                yield batch
+
+            next_page_token = data.get("serpapi_pagination", {}).get("next_page_token")
+            if not next_page_token:
+                return
+            params["next_page_token"] = next_page_token
+
+    @staticmethod
+    def to_job(job: dict) -> JobBase:
+        extensions = job.get("detected_extensions", {})
+        apply_options = job.get("apply_options") or job.get("related_links") or [{}]
+        return JobBase(
+            external_id=job["job_id"],
+            title=job.get("title", ""),
+            company=job.get("company_name", ""),
+            url=apply_options[0].get("link", "") or job.get("share_link", ""),
+            source=SerpAPIService.SOURCE,
+            location=job.get("location", ""),
+            salary=extensions.get("salary", ""),
+            description=job.get("description", ""),
+            typeContrat=extensions.get("schedule_type", ""),
+            dateCreation=_posted_at(extensions.get("posted_at")),
+        )
+
+
+def _posted_at(posted_at: Optional[str]) -> datetime:
+    # day of publication, like the dateCreation stored for the other sources
+    now = datetime.now()
+    match = POSTED_AT_PATTERN.search(posted_at or "")
+    posted = now - int(match.group(1)) * POSTED_AT_UNITS[match.group(2)] if match else now
+    return datetime(posted.year, posted.month, posted.day)
@@ -0,0 +1,176 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import settings
+from utils.colorText import colorText
+
+# upstream answers worth retrying (rate limited or temporarily down)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+class RateLimiter:
+    """
+    Espace les requêtes pour ne pas dépasser `rate` requêtes par seconde.
+    """
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Client HTTP asynchrone partagé (connexions keep-alive réutilisées entre les imports).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=30,
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    host = urlsplit(url).netloc
+    if host not in _host_semaphores:
+        _host_semaphores[host] = asyncio.Semaphore(settings.HTTP_MAX_CONNECTIONS_PER_HOST)
+    return _host_semaphores[host]
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    # exponential backoff with jitter: 0.5s, 1s, 2s... (+/- 25%)
+    delay = settings.HTTP_BACKOFF_BASE * (2 ** attempt)
+    return delay * random.uniform(0.75, 1.25)
+
+
+async def request(method: str, url: str, rate_limiter: Optional[RateLimiter] = None, **kwargs) -> httpx.Response:
+    """
+    Envoie une requête via le client partagé, limitée par hôte, avec retry et backoff.
+    Lève httpx.HTTPError si la requête échoue après tous les essais.
+    """
+    client = get_http_client()
+    attempts = settings.HTTP_RETRIES + 1
+
+    for attempt in range(attempts):
+        is_last_attempt = attempt == attempts - 1
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+        try:
+            async with _host_semaphore(url):
+                response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if is_last_attempt:
+                raise
+            delay = _retry_delay(attempt)
+            print(colorText(f"{method} {url} failed ({e!r}), retry in {delay:.1f}s.", "jaune"))
+            await asyncio.sleep(delay)
+            continue
+
+        if response.status_code in RETRY_STATUS_CODES and not is_last_attempt:
+            delay = _retry_delay(attempt, response)
+            print(colorText(f"{method} {url} returned {response.status_code}, retry in {delay:.1f}s.", "jaune"))
+            await asyncio.sleep(delay)
+            continue
+
+        response.raise_for_status()
+        return response
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, rate_limiter: Optional[RateLimiter] = None, **kwargs) -> AsyncIterator[httpx.Response]:
+    """
+    Comme request, mais le corps de la réponse n'est pas lu : il se consomme au fil de l'eau dans le bloc `async with`.
+    Seuls l'envoi et le statut sont retentés, la connexion est libérée en sortie du bloc.
+    """
+    client = get_http_client()
+    semaphore = _host_semaphore(url)
+    attempts = settings.HTTP_RETRIES + 1
+
+    for attempt in range(attempts):
+        is_last_attempt = attempt == attempts - 1
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+        # the host slot is held while the body streams in
+        await semaphore.acquire()
+        try:
+            response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+        except httpx.TransportError as e:
+            semaphore.release()
+            if is_last_attempt:
+                raise
+            delay = _retry_delay(attempt)
+            print(colorText(f"{method} {url} failed ({e!r}), retry in {delay:.1f}s.", "jaune"))
+            await asyncio.sleep(delay)
+            continue
+
+        if response.status_code in RETRY_STATUS_CODES and not is_last_attempt:
+            await response.aclose()
+            semaphore.release()
+            delay = _retry_delay(attempt, response)
+            print(colorText(f"{method} {url} returned {response.status_code}, retry in {delay:.1f}s.", "jaune"))
+            await asyncio.sleep(delay)
+            continue
+
+        try:
+            response.raise_for_status()
+            yield response
+        finally:
+            await response.aclose()
+            semaphore.release()
+        return
+
+
+class AsyncBodyReader:
+    """
+    Vue « fichier » asynchrone d'une réponse en streaming, pour les parseurs incrémentaux (ijson).
+    """
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+        self._buffer = b""
+
+    async def read(self, size: int = -1) -> bytes:
+        # never more than `size` bytes (ijson probes the type with read(0)), an empty read means the body is over
+        if size == 0:
+            return b""
+        if not self._buffer:
+            try:
+                self._buffer = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                return b""
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
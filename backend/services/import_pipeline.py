@@ -0,0 +1,162 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Set, Tuple
+
+from auth.schemas import JobBase, StageMetrics
+from core.config import settings
+from database import AsyncSessionLocal
+from utils.colorText import colorText
+
+STAGES = ("fetch", "normalise", "write")
+
+
+class ImportPipeline:
+    """
+    Import en trois étapes reliées par des files bornées : récupération (une tâche par source) -> normalisation
+    (offres brutes -> JobBase) -> écriture par lots. Une file pleine bloque l'étape précédente (backpressure),
+    une source lente ne retarde donc pas l'écriture des offres des autres. Chaque étape mesure son débit.
+    `normalise` tourne dans un thread (IMPORT_NORMALISE_CONCURRENCY threads au plus).
+    """
+    def __init__(
+        self,
+        normalise: Callable[[str, List[Any]], List[JobBase]],
+        write: Callable[[str, List[JobBase], Any], Awaitable[None]],
+        on_source_done: Callable[[str], Awaitable[None]],
+    ):
+        self.normalise = normalise
+        self.write = write
+        self.on_source_done = on_source_done
+        self.failed: Set[str] = set()
+        self.errors: Dict[str, str] = {}
+        self.metrics: Dict[str, StageMetrics] = {
+            "fetch": StageMetrics(),
+            "normalise": StageMetrics(workers=settings.IMPORT_NORMALISE_CONCURRENCY),
+            "write": StageMetrics(workers=settings.IMPORT_WRITE_CONCURRENCY),
+        }
+        self._raw: asyncio.Queue = asyncio.Queue(maxsize=settings.IMPORT_QUEUE_SIZE)
+        self._jobs: asyncio.Queue = asyncio.Queue(maxsize=settings.IMPORT_QUEUE_SIZE)
+        # batches of each source still in a queue or a stage, the source is done when its fetcher ended and this is 0
+        self._in_flight: Dict[str, int] = {}
+        self._fetching: Set[str] = set()
+
+    async def run(self, fetchers: Dict[str, AsyncIterator[List[Any]]]) -> None:
+        started_at = time.monotonic()
+        self.metrics["fetch"].workers = len(fetchers)
+        self._fetching = set(fetchers)
+        self._in_flight = {source: 0 for source in fetchers}
+
+        workers = [
+            asyncio.create_task(self._normalise_worker())
+            for _ in range(settings.IMPORT_NORMALISE_CONCURRENCY)
+        ] + [
+            asyncio.create_task(self._write_worker())
+            for _ in range(settings.IMPORT_WRITE_CONCURRENCY)
+        ]
+        try:
+            await asyncio.gather(*[self._fetch(source, fetcher) for source, fetcher in fetchers.items()])
+            await self._raw.join()
+            await self._jobs.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        elapsed = time.monotonic() - started_at
+        for name in STAGES:
+            stage = self.metrics[name]
+            stage.busy_seconds = round(stage.busy_seconds, 3)
+            stage.blocked_seconds = round(stage.blocked_seconds, 3)
+            stage.items_per_second = round(stage.items_out / elapsed, 1) if elapsed else 0.0
+            print(colorText(
+                f"Import stage {name}: {stage.items_in} in, {stage.items_out} out, "
+                f"{stage.busy_seconds}s busy, {stage.blocked_seconds}s blocked, {stage.items_per_second}/s.",
+                'bleu'
+            ))
+
+    async def _fetch(self, source: str, fetcher: AsyncIterator[List[Any]]) -> None:
+        stage = self.metrics["fetch"]
+        try:
+            while True:
+                busy_from = time.monotonic()
+                try:
+                    batch = await fetcher.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    stage.busy_seconds += time.monotonic() - busy_from
+                if not batch:
+                    continue
+                stage.items_in += len(batch)
+                stage.items_out += len(batch)
+                self._in_flight[source] += 1
+                await self._put(self._raw, (source, batch), stage)
+        except Exception as e:
+            self.failed.add(source)
+            self.errors[source] = str(e)
+            print(colorText(f"Error fetching from {source}: {e}", 'rouge'))
+        finally:
+            self._fetching.discard(source)
+            await self._batch_done(source, finished=False)
+
+    async def _normalise_worker(self) -> None:
+        stage = self.metrics["normalise"]
+        while True:
+            source, batch = await self._raw.get()
+            jobs: List[JobBase] = []
+            busy_from = time.monotonic()
+            try:
+                stage.items_in += len(batch)
+                # CPU work in a thread: the event loop keeps fetching and writing meanwhile
+                jobs = await asyncio.to_thread(self.normalise, source, batch)
+                stage.items_out += len(jobs)
+            except Exception as e:
+                self.failed.add(source)
+                print(colorText(f"Error normalising {source} offers: {e}", 'rouge'))
+            finally:
+                stage.busy_seconds += time.monotonic() - busy_from
+            try:
+                if jobs:
+                    await self._put(self._jobs, (source, jobs), stage)
+                else:
+                    await self._batch_done(source)
+            finally:
+                self._raw.task_done()
+
+    async def _write_worker(self) -> None:
+        stage = self.metrics["write"]
+        # one session per writer: writers can commit concurrently
+        async with AsyncSessionLocal() as db:
+            while True:
+                source, jobs = await self._jobs.get()
+                busy_from = time.monotonic()
+                try:
+                    stage.items_in += len(jobs)
+                    await self.write(source, jobs, db)
+                    stage.items_out += len(jobs)
+                except Exception as e:
+                    self.failed.add(source)
+                    print(colorText(f"Error writing {source} offers: {e}", 'rouge'))
+                finally:
+                    stage.busy_seconds += time.monotonic() - busy_from
+                    try:
+                        await self._batch_done(source)
+                    finally:
+                        self._jobs.task_done()
+
+    async def _put(self, queue: asyncio.Queue, item: Tuple[str, List[Any]], stage: StageMetrics) -> None:
+        # time spent waiting here is backpressure from the next stage
+        blocked_from = time.monotonic()
+        await queue.put(item)
+        stage.blocked_seconds += time.monotonic() - blocked_from
+
+    async def _batch_done(self, source: str, finished: bool = True) -> None:
+        if finished:
+            self._in_flight[source] -= 1
+        if source not in self._fetching and self._in_flight[source] == 0:
+            # mark it once: -1 can't be reached by a later batch
+            self._in_flight[source] = -1
+            try:
+                await self.on_source_done(source)
+            except Exception as e:
+                # progress reporting only: the other sources and batches go on
+                print(colorText(f"Error reporting the end of {source}: {e}", 'rouge'))
@@ -0,0 +1,165 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from auth.schemas import SourceProgress, StageMetrics
+from database import AsyncSessionLocal, engine
+from models.models import ImportRun
+from services import job_sources
+from services.job_aggregator import JobAggregator
+from utils.colorText import colorText
+
+# source -> id of the run currently importing it (single-flight per source)
+_active_runs: Dict[str, str] = {}
+# keep a reference on the running tasks so they are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+# advisory lock key of a source: hashtext(IMPORT_LOCK_PREFIX + source)
+IMPORT_LOCK_PREFIX = "nextoffer:import:"
+
+
+async def start_import(db: AsyncSession, sources: Optional[List[str]] = None) -> Tuple[Optional[ImportRun], bool]:
+    """
+    Lance un import en tâche de fond pour les sources qui ne sont pas déjà en cours d'import, dans ce process
+    ou dans un autre worker (verrou consultatif PostgreSQL par source).
+    Renvoie le run existant et False si toutes les sources demandées sont déjà en cours (None si ce run
+    d'un autre worker n'est pas encore enregistré).
+    """
+    requested = list(sources or job_sources.enabled_sources())
+    free_sources = [source for source in requested if source not in _active_runs]
+    # claim the sources before the first await: the check above and the claim are atomic for the event loop
+    claim_id = uuid.uuid4().hex
+    for source in free_sources:
+        _active_runs[source] = claim_id
+    locked_sources, lock_connection = await _lock_sources(free_sources) if free_sources else ([], None)
+    for source in set(free_sources) - set(locked_sources):
+        _active_runs.pop(source, None)
+    if not locked_sources:
+        return await _find_active_run(db, requested[0]), False
+
+    run = ImportRun(
+        id=claim_id,
+        status="pending",
+        created_at=datetime.now(),
+        sources={source: SourceProgress().model_dump(mode="json") for source in locked_sources},
+        stats={},
+    )
+    try:
+        db.add(run)
+        await db.commit()
+    except Exception:
+        for source in locked_sources:
+            _active_runs.pop(source, None)
+        await _unlock_sources(locked_sources, lock_connection)
+        raise
+
+    task = asyncio.create_task(_run_import(run.id, locked_sources, lock_connection))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return run, True
+
+
+async def _find_active_run(db: AsyncSession, source: str) -> Optional[ImportRun]:
+    if source in _active_runs:
+        return await db.get(ImportRun, _active_runs[source])
+    # run of another worker: the few pending / running ones are filtered here, the sources are JSON
+    runs = await db.scalars(
+        select(ImportRun).where(ImportRun.status.in_(["pending", "running"])).order_by(ImportRun.created_at.desc())
+    )
+    return next((run for run in runs if source in run.sources), None)
+
+
+async def _lock_sources(sources: List[str]) -> Tuple[List[str], Optional[AsyncConnection]]:
+    """
+    Verrou consultatif PostgreSQL par source, tenu par une connexion dédiée jusqu'à la fin du run :
+    un seul worker importe une source à la fois, et le verrou tombe avec la connexion si le worker meurt.
+    Sans PostgreSQL (dev, un seul process), _active_runs suffit.
+    """
+    if engine.dialect.name != "postgresql":
+        return sources, None
+    connection = await engine.connect()
+    locked = [
+        source for source in sources
+        if await connection.scalar(select(func.pg_try_advisory_lock(func.hashtext(IMPORT_LOCK_PREFIX + source))))
+    ]
+    # session-level locks outlive the transaction: don't leave the connection idle in transaction
+    await connection.commit()
+    if not locked:
+        await connection.close()
+        return [], None
+    return locked, connection
+
+
+async def _unlock_sources(sources: List[str], connection: Optional[AsyncConnection]) -> None:
+    if connection is None:
+        return
+    try:
+        # a pooled connection keeps its session locks: release them before giving it back
+        for source in sources:
+            await connection.scalar(select(func.pg_advisory_unlock(func.hashtext(IMPORT_LOCK_PREFIX + source))))
+        await connection.commit()
+    finally:
+        await connection.close()
+
+
+async def _run_import(run_id: str, sources: List[str], lock_connection: Optional[AsyncConnection]) -> None:
+    db = AsyncSessionLocal()
+    run = await db.get(ImportRun, run_id)
+    initial_sources = run.sources
+    progress: Dict[str, SourceProgress] = {}
+    stages: Dict[str, StageMetrics] = {}
+
+    async def save_progress() -> None:
+        # in a session of its own: a failed save is rolled back with it, the run's session stays usable
+        sources_progress = {source: state.model_dump(mode="json") for source, state in progress.items()}
+        async with AsyncSessionLocal() as progress_db:
+            await progress_db.execute(update(ImportRun).where(ImportRun.id == run_id).values(sources=sources_progress))
+            await progress_db.commit()
+
+    try:
+        run.status = "running"
+        run.started_at = datetime.now()
+        await db.commit()
+
+        stats = await JobAggregator.aggregate_jobs(db, sources, progress, on_progress=save_progress, stages=stages)
+
+        run.stats = stats.model_dump()
+        run.status = "failed" if any(state.status == "failed" for state in progress.values()) else "succeeded"
+    except asyncio.CancelledError:
+        await db.rollback()
+        run.status = "interrupted"
+        raise
+    except Exception as e:
+        await db.rollback()
+        run.status = "failed"
+        run.error = str(e)
+        print(colorText(f"Import {run_id} failed: {e}", 'rouge'))
+    finally:
+        for source in sources:
+            _active_runs.pop(source, None)
+        try:
+            # run.sources may be expired by a rollback, an async session can't reload it here
+            run.sources = {source: state.model_dump(mode="json") for source, state in progress.items()} or initial_sources
+            if stages:
+                run.stages = {name: stage.model_dump() for name, stage in stages.items()}
+            run.finished_at = datetime.now()
+            await db.commit()
+            await db.close()
+        finally:
+            # after the final status: another worker may start the next import of these sources
+            await _unlock_sources(sources, lock_connection)
+
+
+async def mark_interrupted_runs(db: AsyncSession) -> None:
+    """
+    Les runs restés 'pending' ou 'running' ont été coupés par un arrêt du serveur.
+    """
+    await db.execute(
+        update(ImportRun)
+        .where(ImportRun.status.in_(["pending", "running"]))
+        .values(status="interrupted", finished_at=datetime.now())
+    )
+    await db.commit()
@@ -1,67 +1,608 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from sqlite3 import IntegrityError
-from typing import List
+import threading
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from utils.colorText import colorText
-from sqlalchemy.orm import Session
+from sqlalchemy import Boolean, CompoundSelect, Row, Select, bindparam, case, delete, exists, func, insert, literal, or_, select, tuple_, union, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
 
-from auth.schemas import JobBase, JobResponse
-from database import get_db
-from models.models import Job
-from services.external_apis.remotive import RemotiveService
-from services.external_apis.francetravail import FranceTravailService
+from auth.schemas import ImportStats, JobBase, SourceProgress, StageMetrics
+from database import AsyncSessionLocal, dialect_insert
+from models.models import AppliedJob, Job, JobAlias, JobSimhashBand, SeenJob, SyncState
+from services import job_dedup, job_recommender, job_search, job_sources, response_cache
+from services.import_pipeline import ImportPipeline
 from core.config import settings
 
+# columns refreshed when an offer we already know comes back from its source
+UPSERT_COLUMNS = (
+    "title",
+    "company",
+    "url",
+    "source",
+    "location",
+    "salary",
+    "description",
+    "typeContrat",
+    "dateCreation",
+    "fingerprint",
+    "simhash",
+    "vector",
+)
+
+# columns a canonical job takes from a near-duplicate when its own value is empty
+FILLED_COLUMNS = ("url", "salary", "typeContrat")
+
+# columns of the job listing; the description is cut in SQL, /jobs/{id} serves the full text
+LIST_COLUMNS = (
+    Job.id,
+    Job.external_id,
+    Job.title,
+    Job.company,
+    Job.url,
+    Job.source,
+    Job.location,
+    Job.salary,
+    Job.typeContrat,
+    Job.dateCreation,
+    Job.liked,
+)
+
 class JobAggregator:
+
     @staticmethod
-    async def aggregate_jobs(db: Session) -> None:
-        """
-        Agrège les offres d'emploi des différentes sources et les enregistre dans la base de données.
-        """
-        loop = asyncio.get_running_loop()
-        remotive_future = loop.run_in_executor(None, RemotiveService.fetch_jobs)
-
-        # retrieve jobs in parallel from Remotive and FranceTravail
-        remotive_jobs, france_travail_jobs = await asyncio.gather(remotive_future, FranceTravailService.fetch_jobs())
-
-        all_jobs: List[JobBase] = remotive_jobs + france_travail_jobs
-        print(colorText(f"{len(all_jobs)} jobs found.", 'vert_fonce'))
-
-        jobs_to_add = []
-        for job_base in all_jobs:
-            # Check if url already exists in DB
-            existing_job = db.query(Job).filter(Job.url == job_base.url).first()
-            if not existing_job:
-                # Create new instance of Job from JobBase
-                new_job = Job(
-                    external_id=job_base.external_id,
-                    title=job_base.title,
-                    company=job_base.company,
-                    url=job_base.url,
-                    source=job_base.source,
-                    location=job_base.location,
-                    salary=job_base.salary,
-                    description=job_base.description,
-                    typeContrat=job_base.typeContrat,
-                    dateCreation=job_base.dateCreation,
-                    liked=False
+    async def aggregate_jobs(
+        db: AsyncSession,
+        sources: Optional[List[str]] = None,
+        progress: Optional[Dict[str, SourceProgress]] = None,
+        on_progress: Optional[Callable[[], Awaitable[None]]] = None,
+        stages: Optional[Dict[str, StageMetrics]] = None,
+    ) -> ImportStats:
+        """
+        Agrège les offres d'emploi des sources du registre (job_sources) et les enregistre dans la base de données.
+        `progress` est mis à jour source par source et `on_progress` est appelé après chaque lot enregistré.
+        `stages` reçoit les métriques de chaque étape du pipeline d'import.
+        """
+        sources = list(sources or job_sources.enabled_sources())
+        progress = progress if progress is not None else {}
+        states = await JobAggregator._load_sync_states(db, sources)
+        await JobAggregator.backfill_fingerprints(db)
+        await JobAggregator.backfill_vectors(db)
+
+        started_at = datetime.now()
+        registered = {name: job_sources.get_source(name) for name in sources}
+        fetchers: Dict[str, AsyncIterator[List[dict]]] = {}
+        skipped: Set[str] = set()
+        for name, entry in registered.items():
+            if entry.client.breaker.is_open:
+                # the upstream failed recently, don't spend the import window on it
+                error = f"{name}: circuit ouvert, source ignorée."
+                print(colorText(error, 'jaune'))
+                progress[name] = SourceProgress(
+                    status="failed", started_at=started_at, finished_at=started_at, duration_seconds=0, error=error
                 )
-                jobs_to_add.append(new_job)
-                
-        if jobs_to_add:
+                skipped.add(name)
+                continue
+            progress[name] = SourceProgress(status="running", started_at=started_at)
+            # only ask for the delta: each source uses the watermark (e.g. minCreationDate for France Travail),
+            # and those with SKIP_KNOWN_IDS also skip the ids we already have
+            known_ids: Set[str] = set()
+            if entry.source.SKIP_KNOWN_IDS:
+                known_ids = set(await db.scalars(select(Job.external_id).where(Job.source == name)))
+                known_ids.update(await db.scalars(select(JobAlias.external_id).where(JobAlias.source == name)))
+            fetchers[name] = entry.iter_jobs(_watermark(states[name]), known_ids)
+
+        newest: Dict[str, datetime] = {}
+        # on_progress writes the progress, never twice at once
+        progress_lock = asyncio.Lock()
+
+        # normalise runs in the pipeline's threads, several at once may count skipped offers
+        stats_lock = threading.Lock()
+
+        def normalise(source: str, offers: List[dict]) -> List[JobBase]:
+            to_job = registered[source].source.to_job
+            jobs = []
+            for offer in offers:
+                try:
+                    jobs.append(to_job(offer))
+                except (KeyError, TypeError, ValueError) as e:
+                    with stats_lock:
+                        progress[source].stats.fetched += 1
+                        progress[source].stats.skipped += 1
+                    print(colorText(f"Invalid {source} offer skipped: {e}", 'jaune'))
+            return jobs
+
+        async def write(source: str, jobs: List[JobBase], session: AsyncSession) -> None:
+            batch_stats = await JobAggregator.ingest_jobs(jobs, session)
+            progress[source].stats.add(batch_stats)
+            if batch_stats.inserted or batch_stats.updated or batch_stats.merged:
+                # committed: the cached listings are stale
+                await response_cache.bump_generation()
+            if batch_stats.failed:
+                pipeline.failed.add(source)
+            batch_newest = max(job.dateCreation for job in jobs)
+            newest[source] = max(newest.get(source, batch_newest), batch_newest)
+            await report_progress()
+
+        async def source_done(source: str) -> None:
+            source_progress = progress[source]
+            source_progress.finished_at = datetime.now()
+            source_progress.duration_seconds = (source_progress.finished_at - source_progress.started_at).total_seconds()
+            source_progress.status = "failed" if source in pipeline.failed else "succeeded"
+            source_progress.error = pipeline.errors.get(source)
+            await report_progress()
+
+        async def report_progress() -> None:
+            if on_progress is None:
+                return
             try:
-                db.bulk_save_objects(jobs_to_add)
-                db.commit()
-                print(colorText(f"{len(jobs_to_add)} new jobs saved to DB.", 'vert_fonce'))
-            except IntegrityError as e:
-                db.rollback()
+                async with progress_lock:
+                    await on_progress()
+            except Exception as e:
+                # a progress save that fails (e.g. database is locked) must not stop the import
+                print(colorText(f"Error saving import progress: {e}", 'rouge'))
+
+        # fetch -> normalise -> write: every source is written as soon as its batches arrive
+        pipeline = ImportPipeline(normalise, write, source_done)
+        await pipeline.run(fetchers)
+        if stages is not None:
+            stages.update(pipeline.metrics)
+        failed = pipeline.failed | skipped
+
+        await JobAggregator._save_sync_states(db, sources, newest, failed)
+
+        stats = ImportStats()
+        for source in registered:
+            stats.add(progress[source].stats)
+        print(colorText(f"{stats.fetched} jobs found.", 'vert_fonce'))
+        print(colorText(
+            f"Import done: {stats.inserted} inserted, {stats.updated} updated, "
+            f"{stats.merged} merged, {stats.skipped} skipped, {stats.failed} failed.",
+            'vert_fonce'
+        ))
+        return stats
+
+    @staticmethod
+    async def ingest_jobs(jobs: List[JobBase], db: AsyncSession, stats: Optional[ImportStats] = None) -> ImportStats:
+        """
+        Enregistre un lot d'offres avec un INSERT ... ON CONFLICT par paquet de IMPORT_CHUNK_SIZE offres.
+        """
+        stats = stats if stats is not None else ImportStats()
+        stats.fetched += len(jobs)
+        unique_jobs = JobAggregator._dedupe(jobs, stats)
+
+        chunk_size = settings.IMPORT_CHUNK_SIZE
+        for start in range(0, len(unique_jobs), chunk_size):
+            chunk = unique_jobs[start:start + chunk_size]
+            try:
+                await JobAggregator._upsert_chunk(chunk, db, stats)
+                await db.commit()
+            except SQLAlchemyError as e:
+                await db.rollback()
+                stats.failed += len(chunk)
                 print(colorText(f"Error saving jobs to DB: {e}", 'rouge'))
+        return stats
+
+    @staticmethod
+    def _dedupe(jobs: List[JobBase], stats: ImportStats) -> List[JobBase]:
+        # keep the first occurrence of each external_id / url of the batch
+        seen_ids = set()
+        seen_urls = set()
+        unique_jobs: List[JobBase] = []
+        for job in jobs:
+            if not job.external_id or job.external_id in seen_ids or (job.url and job.url in seen_urls):
+                stats.skipped += 1
+                continue
+            seen_ids.add(job.external_id)
+            if job.url:
+                seen_urls.add(job.url)
+            unique_jobs.append(job)
+        return unique_jobs
+
+    @staticmethod
+    async def _upsert_chunk(chunk: List[JobBase], db: AsyncSession, stats: ImportStats) -> None:
+        external_ids = [job.external_id for job in chunk]
+        urls = [job.url for job in chunk if job.url]
+
+        # 1. one lookup for the whole chunk: known ids, offers already merged and urls already owned by another offer
+        existing = (await db.execute(
+            select(Job.external_id, Job.url).where(or_(Job.external_id.in_(external_ids), Job.url.in_(urls)))
+        )).all()
+        known_ids = {row.external_id for row in existing}
+        url_owners: Dict[str, str] = {row.url: row.external_id for row in existing if row.url}
+        aliases = set(await db.scalars(select(JobAlias.external_id).where(JobAlias.external_id.in_(external_ids))))
+
+        # 2. near-duplicates of the new offers, in the table or earlier in the chunk
+        fingerprints = {
+            job.external_id: job_dedup.fingerprint(job.title, job.company, job.location, job.description)
+            for job in chunk
+        }
+        new_jobs = [job for job in chunk if job.external_id not in known_ids and job.external_id not in aliases]
+        merged_into = await JobAggregator._find_duplicates(db, new_jobs, fingerprints)
+
+        rows = []
+        for job in chunk:
+            if job.external_id in aliases:
+                stats.skipped += 1
+                continue
+            if job.external_id in merged_into:
+                continue
+            owner = url_owners.get(job.url) if job.url else None
+            if owner is not None and owner != job.external_id:
+                stats.skipped += 1
+                continue
+            fp = fingerprints[job.external_id]
+            rows.append({
+                "external_id": job.external_id,
+                "title": job.title,
+                "company": job.company,
+                "url": job.url,
+                "source": job.source,
+                "location": job.location,
+                "salary": job.salary,
+                "description": job.description,
+                "typeContrat": job.typeContrat,
+                "dateCreation": job.dateCreation,
+                "fingerprint": fp.key,
+                "simhash": fp.simhash,
+                "vector": job_recommender.to_bytes(job_recommender.vectorize(job.title, job.description)),
+                "liked": False,
+            })
+
+        # 3. one INSERT ... ON CONFLICT (external_id) DO UPDATE, only touching rows that changed
+        written: Dict[str, int] = {}
+        if rows:
+            stmt = dialect_insert(db, Job.__table__).values(rows)
+            columns = Job.__table__.c
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[columns.external_id],
+                set_={name: stmt.excluded[name] for name in UPSERT_COLUMNS},
+                where=or_(*[columns[name].is_distinct_from(stmt.excluded[name]) for name in UPSERT_COLUMNS]),
+            ).returning(columns.id, columns.external_id)
+            written = {row.external_id: row.id for row in await db.execute(stmt)}
+            await job_search.index_jobs(db, list(written))
+            await JobAggregator._index_simhash_bands(db, {written[external_id]: fingerprints[external_id] for external_id in written})
+
+            inserted = written.keys() - known_ids
+            stats.inserted += len(inserted)
+            stats.updated += len(written) - len(inserted)
+            stats.skipped += len(rows) - len(written)
+
+        # 4. the near-duplicates become aliases of their canonical job
+        if merged_into:
+            jobs = {job.external_id: job for job in chunk}
+            await JobAggregator._merge_duplicates(db, jobs, merged_into, written, stats)
+
+    @staticmethod
+    def duplicate_candidates_query(keys: Set[str], bands: Set[int]) -> CompoundSelect:
+        # same exact key, or a band of the SimHash in common; a UNION rather than an OR so each side reads its index
+        columns = (Job.id, Job.title, Job.fingerprint, Job.simhash)
+        return union(
+            select(*columns).where(Job.fingerprint.in_(keys)),
+            select(*columns).join(JobSimhashBand, JobSimhashBand.job_id == Job.id).where(JobSimhashBand.band_key.in_(bands)),
+        )
 
     @staticmethod
-    def get_jobs_from_db(offset: int, limit: int, db: Session) -> List[Job]:
+    async def _find_duplicates(
+        db: AsyncSession,
+        jobs: List[JobBase],
+        fingerprints: Dict[str, job_dedup.Fingerprint],
+    ) -> Dict[str, Union[int, str]]:
         """
-        Récupère les offres d'emploi directement depuis la base de données.
+        Renvoie external_id -> job canonique (id en base, ou external_id d'une offre plus haut dans le lot).
+        Les candidats en base sont lus en une requête : même clé exacte ou une bande de SimHash en commun.
+        """
+        if not jobs:
+            return {}
+        keys = {fingerprints[job.external_id].key for job in jobs}
+        bands = {band for job in jobs for band in fingerprints[job.external_id].bands()}
+        candidates = await db.execute(JobAggregator.duplicate_candidates_query(keys, bands))
+        index = job_dedup.LSHIndex()
+        for row in candidates:
+            index.add(row.id, job_dedup.Fingerprint(row.fingerprint, job_dedup.normalise_title(row.title), row.simhash))
+
+        merged_into: Dict[str, Union[int, str]] = {}
+        for job in jobs:
+            fp = fingerprints[job.external_id]
+            canonical = index.find(fp)
+            if canonical is None:
+                index.add(job.external_id, fp)
+            else:
+                merged_into[job.external_id] = canonical
+        return merged_into
+
+    @staticmethod
+    async def _merge_duplicates(
+        db: AsyncSession,
+        jobs: Dict[str, JobBase],
+        merged_into: Dict[str, Union[int, str]],
+        written: Dict[str, int],
+        stats: ImportStats,
+    ) -> None:
+        aliases = []
+        for external_id, canonical in merged_into.items():
+            job_id = canonical if isinstance(canonical, int) else written.get(canonical)
+            if job_id is None:
+                # its canonical offer of the chunk was not written (url owned by another offer)
+                stats.skipped += 1
+                continue
+            job = jobs[external_id]
+            aliases.append({
+                "external_id": external_id,
+                "job_id": job_id,
+                "source": job.source,
+                "b_job_id": job_id,
+                "b_url": job.url,
+                "b_salary": job.salary,
+                "b_typeContrat": job.typeContrat,
+            })
+        if not aliases:
+            return
+
+        stmt = dialect_insert(db, JobAlias.__table__).on_conflict_do_nothing(index_elements=["external_id"])
+        await db.execute(stmt, [{name: alias[name] for name in ("external_id", "job_id", "source")} for alias in aliases])
+        # the canonical job takes what it lacks from its duplicates (France Travail often has no url)
+        columns = Job.__table__.c
+        await db.execute(
+            update(Job.__table__).where(columns.id == bindparam("b_job_id")).values({
+                name: case((or_(columns[name].is_(None), columns[name] == ""), bindparam(f"b_{name}")), else_=columns[name])
+                for name in FILLED_COLUMNS
+            }),
+            [{key: value for key, value in alias.items() if key.startswith("b_")} for alias in aliases],
+        )
+        stats.merged += len(aliases)
+
+    @staticmethod
+    async def _index_simhash_bands(db: AsyncSession, fingerprints: Dict[int, job_dedup.Fingerprint]) -> None:
+        if not fingerprints:
+            return
+        await db.execute(delete(JobSimhashBand).where(JobSimhashBand.job_id.in_(list(fingerprints))))
+        bands = [
+            {"band_key": band, "job_id": job_id}
+            for job_id, fp in fingerprints.items()
+            for band in fp.bands()
+        ]
+        if bands:
+            await db.execute(insert(JobSimhashBand), bands)
+
+    @staticmethod
+    async def backfill_fingerprints(db: AsyncSession) -> int:
+        """
+        Calcule l'empreinte des offres enregistrées avant la détection des doublons (une seule fois).
+        """
+        columns = Job.__table__.c
+        total = 0
+        while True:
+            rows = (await db.execute(
+                select(Job.id, Job.title, Job.company, Job.location, Job.description)
+                .where(Job.fingerprint.is_(None))
+                .limit(settings.IMPORT_CHUNK_SIZE)
+            )).all()
+            if not rows:
+                break
+            fingerprints = {
+                row.id: job_dedup.fingerprint(row.title, row.company, row.location, row.description)
+                for row in rows
+            }
+            await db.execute(
+                update(Job.__table__)
+                .where(columns.id == bindparam("b_id"))
+                .values(fingerprint=bindparam("b_fingerprint"), simhash=bindparam("b_simhash")),
+                [{"b_id": job_id, "b_fingerprint": fp.key, "b_simhash": fp.simhash} for job_id, fp in fingerprints.items()],
+            )
+            await JobAggregator._index_simhash_bands(db, fingerprints)
+            await db.commit()
+            total += len(rows)
+        if total:
+            print(colorText(f"Fingerprints computed for {total} existing jobs.", 'bleu'))
+        return total
+
+    @staticmethod
+    async def backfill_vectors(db: AsyncSession) -> int:
+        """
+        Calcule le vecteur des offres enregistrées avant les recommandations (une seule fois).
+        """
+        columns = Job.__table__.c
+        total = 0
+        while True:
+            rows = (await db.execute(
+                select(Job.id, Job.title, Job.description).where(Job.vector.is_(None)).limit(settings.IMPORT_CHUNK_SIZE)
+            )).all()
+            if not rows:
+                break
+            await db.execute(
+                update(Job.__table__).where(columns.id == bindparam("b_id")).values(vector=bindparam("b_vector")),
+                [
+                    {"b_id": row.id, "b_vector": job_recommender.to_bytes(job_recommender.vectorize(row.title, row.description))}
+                    for row in rows
+                ],
+            )
+            await db.commit()
+            total += len(rows)
+        if total:
+            print(colorText(f"Vectors computed for {total} existing jobs.", 'bleu'))
+            # the recommendation indexes are rebuilt on the next generation
+            await response_cache.bump_generation()
+        return total
+
+    @staticmethod
+    async def _load_sync_states(db: AsyncSession, sources: List[str]) -> Dict[str, SyncState]:
+        # populate_existing: a rollback during the import expired the states loaded at its start
+        query = select(SyncState).where(SyncState.source.in_(sources)).execution_options(populate_existing=True)
+        states = {state.source: state for state in await db.scalars(query)}
+        for source in sources:
+            if source not in states:
+                states[source] = SyncState(source=source)
+                db.add(states[source])
+        return states
+
+    @staticmethod
+    async def _save_sync_states(db: AsyncSession, sources: List[str], newest: Dict[str, datetime], failed: Set[str]) -> None:
+        # a failed source keeps its old watermark so the missing offers are requested again next time
+        states = await JobAggregator._load_sync_states(db, sources)
+        now = datetime.now()
+        for source, state in states.items():
+            if source in failed:
+                print(colorText(f"{source}: import incomplet, watermark conservé.", 'jaune'))
+                continue
+            state.last_success_at = now
+            if source in newest and (state.last_date_creation is None or newest[source] > state.last_date_creation):
+                state.last_date_creation = newest[source]
+        try:
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            print(colorText(f"Error saving sync state: {e}", 'rouge'))
+
+    @staticmethod
+    async def get_jobs_from_db(
+        limit: int,
+        db: AsyncSession,
+        after: Optional[Tuple[datetime, int]] = None,
+        source: Optional[str] = None,
+        typeContrat: Optional[str] = None,
+        location: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> List[Row]:
+        """
+        Récupère les offres d'emploi directement depuis la base de données, les plus récentes d'abord.
+        Pagination par clé (keyset) : `after` est le couple (dateCreation, id) de la dernière offre déjà reçue.
+        Seules les colonnes de la liste sont lues, avec au plus JOB_LIST_DESCRIPTION_LENGTH + 1 caractères de description.
         """
         print(colorText(f"Retrieving {limit} jobs from DB.", 'vert_fonce'))
-        return db.query(Job).offset(offset).limit(limit).all()
\ No newline at end of file
+        query = JobAggregator.jobs_page_query(limit, after, source, typeContrat, location, date_from, date_to)
+        return list(await db.execute(query))
+
+    @staticmethod
+    def jobs_page_query(
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        source: Optional[str] = None,
+        typeContrat: Optional[str] = None,
+        location: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> Select:
+        # one extra character tells the caller whether the description was cut
+        description = func.substr(Job.description, 1, settings.JOB_LIST_DESCRIPTION_LENGTH + 1).label("description")
+        query = _filter_jobs(select(*LIST_COLUMNS, description), source, typeContrat, location, date_from, date_to)
+        if after is not None:
+            query = query.where(tuple_(Job.dateCreation, Job.id) < tuple_(*after))
+        return query.order_by(Job.dateCreation.desc(), Job.id.desc()).limit(limit)
+
+    @staticmethod
+    def feed_page_query(
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        source: Optional[str] = None,
+        typeContrat: Optional[str] = None,
+        location: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        exclude_ids: Optional[List[int]] = None,
+    ) -> Select:
+        """
+        Page de jobs_page_query sans les offres déjà vues ou candidatées par l'utilisateur (anti-jointures
+        NOT EXISTS sur l'index unique (user_id, job_id)). `exclude_ids` : vues pas encore écrites en base.
+        """
+        query = JobAggregator.jobs_page_query(limit, after, source, typeContrat, location, date_from, date_to)
+        for link_model in (SeenJob, AppliedJob):
+            query = query.where(~exists().where(link_model.user_id == user_id, link_model.job_id == Job.id))
+        if exclude_ids:
+            query = query.where(Job.id.not_in(exclude_ids))
+        return query
+
+    @staticmethod
+    async def iter_jobs_export(
+        source: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> AsyncIterator[List[Row]]:
+        """
+        Parcourt toutes les offres (par id croissant) avec un curseur côté serveur, par lots de EXPORT_BATCH_SIZE lignes.
+        Ouvre sa propre session : l'itération continue après la fin de la requête HTTP qui l'a lancée.
+        """
+        query = JobAggregator.export_query(source, date_from, date_to).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+
+    @staticmethod
+    def export_query(source: Optional[str] = None, date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Select:
+        query = _filter_jobs(select(*LIST_COLUMNS, Job.description), source, None, None, date_from, date_to)
+        return query.order_by(Job.id)
+
+
+def _watermark(state: SyncState) -> Optional[datetime]:
+    # some overlap so offers published late or with a shifted date are not missed
+    if state.last_date_creation is None:
+        return None
+    return state.last_date_creation - timedelta(hours=settings.SYNC_WATERMARK_OVERLAP_HOURS)
+
+
+def _filter_jobs(
+    query: Any,
+    source: Optional[str],
+    typeContrat: Optional[str],
+    location: Optional[str],
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+) -> Any:
+    if source:
+        query = query.where(Job.source == source)
+    if typeContrat:
+        query = query.where(Job.typeContrat == typeContrat)
+    if location:
+        query = query.where(_PrefixMatch(func.lower(Job.location), location.lower()))
+    if date_from:
+        query = query.where(Job.dateCreation >= date_from)
+    if date_to:
+        query = query.where(Job.dateCreation <= date_to)
+    return query
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class _PrefixMatch(ColumnElement):
+    """
+    `value` commence par `prefix`, sous la forme que l'index de chaque base sait lire.
+    """
+    type = Boolean()
+    # a condition: no "= 1" added where booleans are integers (SQLite)
+    _is_implicitly_boolean = True
+    inherit_cache = True
+    _traverse_internals = [
+        ("value", InternalTraversal.dp_clauseelement),
+        ("pattern", InternalTraversal.dp_clauseelement),
+        ("lower", InternalTraversal.dp_clauseelement),
+        ("upper", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, value: Any, prefix: str):
+        self.value = value
+        self.pattern = literal(_escape_like(prefix) + "%")
+        self.lower = literal(prefix)
+        # the first string after all those starting with the prefix
+        self.upper = literal(prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+@compiles(_PrefixMatch)
+def _compile_prefix_match(element, compiler, **kw):
+    if compiler.dialect.name == "sqlite":
+        # SQLite never reads an expression index for a LIKE, only for a range
+        condition = (element.value >= element.lower) & (element.value < element.upper)
+    else:
+        # PostgreSQL: LIKE 'prefix%' is a range of the varchar_pattern_ops index
+        condition = element.value.like(element.pattern, escape="\\")
+    return compiler.process(condition, **kw)
+
@@ -0,0 +1,128 @@
+import hashlib
+import html
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+
+# SimHash of 64 bits cut in 4 bands of 16 bits: two hashes at most 3 bits apart share at least one band (LSH)
+SIMHASH_BITS = 64
+BAND_BITS = 16
+BANDS = SIMHASH_BITS // BAND_BITS
+SHINGLE_SIZE = 3
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# "Développeur Python (H/F)", "Data engineer F/H - CDI"...
+GENDER_PATTERN = re.compile(r"\b[hfm]\s*/\s*[hfm](\s*/\s*[hfmx])?\b")
+
+
+class Fingerprint:
+    """
+    Empreinte d'une offre : clé exacte sur titre + entreprise + lieu normalisés et SimHash de la description.
+    `simhash` vaut None quand la description est trop courte pour être comparée.
+    """
+    __slots__ = ("key", "title", "simhash")
+
+    def __init__(self, key: str, title: str, simhash: Optional[int]):
+        self.key = key
+        self.title = title
+        self.simhash = simhash
+
+    def bands(self) -> List[int]:
+        return band_keys(self.simhash) if self.simhash is not None else []
+
+
+def normalise(value: Optional[str]) -> str:
+    # lower case, no accents, no punctuation
+    value = unicodedata.normalize("NFKD", (value or "").lower())
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(WORD_PATTERN.findall(value))
+
+
+def normalise_title(title: Optional[str]) -> str:
+    value = unicodedata.normalize("NFKD", (title or "").lower())
+    return normalise(GENDER_PATTERN.sub(" ", value))
+
+
+def fingerprint(title: str, company: str, location: str, description: str) -> Fingerprint:
+    normalised_title = normalise_title(title)
+    key = hashlib.blake2b(
+        "|".join((normalised_title, normalise(company), normalise(location))).encode(),
+        digest_size=8,
+    ).hexdigest()
+    return Fingerprint(key, normalised_title, simhash(description))
+
+
+def simhash(description: Optional[str]) -> Optional[int]:
+    """
+    SimHash 64 bits des shingles de mots de la description (HTML retiré), en entier signé pour la base.
+    """
+    words = normalise(html.unescape(TAG_PATTERN.sub(" ", description or ""))).split()
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    if len(shingles) < settings.DEDUP_MIN_SHINGLES:
+        return None
+
+    hashes = np.frombuffer(
+        b"".join(hashlib.blake2b(shingle.encode(), digest_size=8).digest() for shingle in shingles),
+        dtype=">u8",
+    )
+    # one column per bit (most significant first): a bit of the SimHash is set when most shingles have it set
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1)
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    value = int.from_bytes(np.packbits(majority).tobytes(), "big")
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def band_keys(value: int) -> List[int]:
+    # band number in the high bits so every band of every job lives in one indexed column
+    unsigned = value & ((1 << SIMHASH_BITS) - 1)
+    mask = (1 << BAND_BITS) - 1
+    return [(band << BAND_BITS) | ((unsigned >> (band * BAND_BITS)) & mask) for band in range(BANDS)]
+
+
+def distance(left: int, right: int) -> int:
+    return ((left ^ right) & ((1 << SIMHASH_BITS) - 1)).bit_count()
+
+
+def is_duplicate(left: Fingerprint, right: Fingerprint) -> bool:
+    """
+    Même titre, entreprise et lieu : doublon si les descriptions sont proches (re-publication retouchée).
+    Sinon (autre source, lieu écrit autrement...) il faut le même titre et une description quasi identique.
+    Sans description comparable, rien ne distingue deux postes identiques d'un même employeur : pas de doublon.
+    """
+    if left.simhash is None or right.simhash is None:
+        return False
+    bits = distance(left.simhash, right.simhash)
+    if left.key == right.key:
+        return bits <= settings.DEDUP_SAME_KEY_DISTANCE
+    return left.title == right.title and bits <= settings.DEDUP_MAX_DISTANCE
+
+
+class LSHIndex:
+    """
+    Index en mémoire des empreintes d'un lot : les candidats d'une offre sont ceux qui partagent
+    sa clé exacte ou une bande de SimHash, sans comparer toutes les paires.
+    """
+    def __init__(self):
+        self._by_key: Dict[str, List[Tuple[object, Fingerprint]]] = {}
+        self._by_band: Dict[int, List[Tuple[object, Fingerprint]]] = {}
+
+    def add(self, item: object, fp: Fingerprint) -> None:
+        self._by_key.setdefault(fp.key, []).append((item, fp))
+        for band in fp.bands():
+            self._by_band.setdefault(band, []).append((item, fp))
+
+    def find(self, fp: Fingerprint) -> Optional[object]:
+        for item, candidate in self._candidates(fp):
+            if is_duplicate(fp, candidate):
+                return item
+        return None
+
+    def _candidates(self, fp: Fingerprint) -> Iterable[Tuple[object, Fingerprint]]:
+        yield from self._by_key.get(fp.key, [])
+        for band in fp.bands():
+            yield from self._by_band.get(band, [])
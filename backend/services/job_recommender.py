@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import html
+import time
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Select, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from database import AsyncSessionLocal
+from models.models import AppliedJob, Job, LikedJob, SeenJob, User
+from services import job_dedup, response_cache
+from utils.colorText import colorText
+
+# words that say nothing about a job, in both languages of the offers
+STOP_WORDS = frozenset((
+    "les", "des", "une", "est", "pour", "par", "sur", "dans", "avec", "que", "qui", "vous", "nous", "votre",
+    "vos", "nos", "notre", "aux", "ses", "son", "sont", "plus", "ainsi", "etc", "cette", "ces", "tout", "tous",
+    "the", "and", "for", "with", "you", "your", "our", "are", "will", "this", "that", "from", "have", "who",
+))
+TITLE_WEIGHT = 2.0
+
+
+def vectorize(title: Optional[str], description: Optional[str]) -> np.ndarray:
+    """
+    Vecteur haché (hashing trick, RECOMMEND_VECTOR_DIM floats) des mots du titre et de la description,
+    poids 1 + log(occurrences), titre compté double, de norme 1. Vecteur nul sans texte exploitable.
+    """
+    counts: Counter = Counter()
+    for word in _words(title):
+        counts[word] += TITLE_WEIGHT
+    for word in _words(description):
+        counts[word] += 1
+
+    vector = np.zeros(settings.RECOMMEND_VECTOR_DIM, dtype=np.float32)
+    if not counts:
+        return vector
+    hashes = np.frombuffer(
+        b"".join(hashlib.blake2b(word.encode(), digest_size=4).digest() for word in counts),
+        dtype="<u4",
+    )
+    # the high bit of the hash gives the sign: colliding words cancel out instead of piling up
+    signs = np.where(hashes >> 31, -1.0, 1.0)
+    weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    np.add.at(vector, hashes % settings.RECOMMEND_VECTOR_DIM, (signs * weights).astype(np.float32))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return vector.astype(np.float32).tobytes()
+
+
+def from_bytes(value: Optional[bytes]) -> Optional[np.ndarray]:
+    # None when missing or computed with another RECOMMEND_VECTOR_DIM
+    if value is None or len(value) != settings.RECOMMEND_VECTOR_DIM * 4:
+        return None
+    return np.frombuffer(value, dtype=np.float32)
+
+
+class VectorIndex:
+    """
+    Vecteurs de toutes les offres en mémoire (matrice float32, une ligne par offre) : les scores d'un profil
+    sont un seul produit matrice-vecteur. Reconstruit en tâche de fond quand la génération du cache des réponses
+    change (offres ajoutées, mises à jour ou fusionnées par un import), jamais pendant une requête.
+    """
+    def __init__(self):
+        # replaced together: a request always reads ids and rows of the same build
+        self.data = (np.empty(0, dtype=np.int64), np.empty((0, settings.RECOMMEND_VECTOR_DIM), dtype=np.float32))
+        self.generation: Optional[int] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.generation is not None
+
+    async def refresh(self) -> bool:
+        """
+        Reconstruit la matrice si la génération a changé depuis la dernière construction. Renvoie True si reconstruite.
+        """
+        # read before the jobs: a bump during the build triggers the next one
+        generation = await response_cache.get_backend().get_generation()
+        if generation == self.generation:
+            return False
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Job.id, Job.vector).where(Job.vector.is_not(None)).order_by(Job.id)
+            )).all()
+        self.data = await asyncio.to_thread(_stack, rows)
+        self.generation = generation
+        return True
+
+    def top_k(self, profile: np.ndarray, k: int, excluded: np.ndarray) -> List[int]:
+        """
+        Ids des k offres de meilleur score (produit scalaire avec le profil), hors `excluded` et scores nuls ou négatifs.
+        """
+        ids, matrix = self.data
+        if not len(ids) or k <= 0:
+            return []
+        scores = matrix @ profile
+        if len(excluded):
+            # ids are sorted (read by id): a binary search per excluded id
+            positions = np.minimum(np.searchsorted(ids, excluded), len(ids) - 1)
+            scores[positions[ids[positions] == excluded]] = -np.inf
+        k = min(k, len(scores))
+        # partial selection of the k best, only those are sorted
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        return [int(ids[i]) for i in top if scores[i] > 0]
+
+
+def _stack(rows) -> Tuple[np.ndarray, np.ndarray]:
+    # in a thread: joining ~100k vectors would block the event loop
+    rows = [row for row in rows if from_bytes(row.vector) is not None]
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    matrix = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.float32)
+    return ids, matrix.reshape(len(rows), settings.RECOMMEND_VECTOR_DIM)
+
+
+# one index per process
+_index = VectorIndex()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def start_recommender() -> None:
+    global _refresh_task
+    _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def close_recommender() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+        _refresh_task = None
+
+
+async def _refresh_loop() -> None:
+    # built at startup, then checked every RECOMMEND_INDEX_REFRESH_SECONDS
+    while True:
+        try:
+            started = time.monotonic()
+            if await _index.refresh():
+                print(colorText(
+                    f"Recommendation index: {len(_index.data[0])} jobs in {time.monotonic() - started:.1f}s "
+                    f"(generation {_index.generation}).", 'bleu'
+                ))
+        except Exception as e:
+            # the previous matrix keeps serving, the next check retries
+            print(colorText(f"Recommendation index refresh failed: {e}", 'rouge'))
+        await asyncio.sleep(settings.RECOMMEND_INDEX_REFRESH_SECONDS)
+
+
+async def rebuild_profile(db: AsyncSession, user_id: int) -> None:
+    """
+    Recalcule le profil de l'utilisateur depuis ses likes, dans la transaction du like ou de l'unlike :
+    des +1/-1 successifs en float32 laisseraient dériver la somme.
+    """
+    # FOR UPDATE (PostgreSQL): the like of a concurrent request is committed, then read by the sum below
+    await db.execute(select(User.id).where(User.id == user_id).with_for_update())
+    profile = await _liked_vectors_sum(db, user_id)
+    await db.execute(update(User).where(User.id == user_id).values(profile_vector=to_bytes(profile)))
+
+
+async def recommend(db: AsyncSession, user_id: int, limit: int, exclude_ids: Iterable[int] = ()) -> List[Job]:
+    """
+    Les `limit` offres les plus proches des offres aimées par l'utilisateur, sans celles qu'il a déjà aimées,
+    vues ou candidatées ni `exclude_ids`. Liste vide tant qu'il n'a rien aimé.
+    """
+    profile = from_bytes(await db.scalar(select(User.profile_vector).where(User.id == user_id)))
+    if profile is None:
+        profile = await _liked_vectors_sum(db, user_id)
+    if not profile.any():
+        return []
+
+    if not _index.ready:
+        # still being built after a start: no recommendations rather than a build in the request
+        return []
+    known = set(await db.scalars(union_all(
+        *(select(link_model.job_id).where(link_model.user_id == user_id) for link_model in (LikedJob, SeenJob, AppliedJob))
+    )))
+    known.update(exclude_ids)
+    # a few more ids: jobs removed since the last build are dropped below
+    ids = _index.top_k(profile, 2 * limit, np.fromiter(known, dtype=np.int64, count=len(known)))
+    if not ids:
+        return []
+    jobs = {job.id: job for job in await db.scalars(select(Job).where(Job.id.in_(ids)))}
+    return [jobs[job_id] for job_id in ids if job_id in jobs][:limit]
+
+
+async def _liked_vectors_sum(db: AsyncSession, user_id: int) -> np.ndarray:
+    profile = np.zeros(settings.RECOMMEND_VECTOR_DIM, dtype=np.float32)
+    for value in await db.scalars(liked_vectors_query(user_id)):
+        vector = from_bytes(value)
+        if vector is not None:
+            profile += vector
+    return profile
+
+
+def liked_vectors_query(user_id: int) -> Select:
+    return select(Job.vector).join(LikedJob, LikedJob.job_id == Job.id).where(LikedJob.user_id == user_id, Job.vector.is_not(None))
+
+
+def _words(text: Optional[str]) -> List[str]:
+    words = job_dedup.normalise(html.unescape(job_dedup.TAG_PATTERN.sub(" ", text or ""))).split()
+    return [word for word in words if len(word) > 2 and word not in STOP_WORDS]
@@ -0,0 +1,101 @@
+import re
+from functools import reduce
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, bindparam, column, func, literal_column, select, table, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import Job
+
+# weighted fields of the search vector, indexed with both configurations (offers are in French and English)
+SEARCH_CONFIGS = ("french", "english")
+WEIGHTED_FIELDS = (("title", "A"), ("company", "B"), ("location", "C"), ("description", "D"))
+# SQLite fallback (jobs_fts, an FTS5 table created by the migrations): bm25 weights in its column order
+FTS5_WEIGHTS = ("10.0", "5.0", "2.0", "1.0")
+jobs_fts = table("jobs_fts", column("rowid"))
+
+
+def search_vector_expression():
+    parts = [
+        func.setweight(
+            func.to_tsvector(literal_column(f"'{config}'::regconfig"), func.coalesce(getattr(Job, field), "")),
+            literal_column(f"'{weight}'"),
+        )
+        for field, weight in WEIGHTED_FIELDS
+        for config in SEARCH_CONFIGS
+    ]
+    return reduce(lambda left, right: left.op("||")(right), parts)
+
+
+def _tsquery(q: str):
+    queries = [func.websearch_to_tsquery(literal_column(f"'{config}'::regconfig"), q) for config in SEARCH_CONFIGS]
+    return reduce(lambda left, right: left.op("||")(right), queries)
+
+
+def _fts5_query(q: str) -> Optional[str]:
+    # quote every term so user input can't break the FTS5 syntax, the last one matches as a prefix
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+async def index_jobs(db: AsyncSession, external_ids: List[str]) -> None:
+    """
+    Met à jour l'index plein texte des offres qui viennent d'être insérées ou modifiées.
+    """
+    if not external_ids:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(
+            update(Job)
+            .where(Job.external_id.in_(external_ids))
+            .values(search_vector=search_vector_expression())
+        )
+    else:
+        await db.execute(
+            text(
+                "INSERT OR REPLACE INTO jobs_fts (rowid, title, company, location, description) "
+                "SELECT id, title, company, location, description FROM jobs WHERE external_id IN :external_ids"
+            ).bindparams(bindparam("external_ids", expanding=True)),
+            {"external_ids": external_ids},
+        )
+
+
+async def search_jobs(
+    db: AsyncSession,
+    q: str,
+    limit: int,
+    after: Optional[Tuple[float, int]] = None,
+) -> List[Tuple[Job, float]]:
+    """
+    Recherche classée par pertinence (score décroissant puis id décroissant), paginée par clé sur (score, id).
+    """
+    stmt = search_query(db.get_bind().dialect.name, q, limit, after)
+    if stmt is None:
+        return []
+    return [(job, float(job_score)) for job, job_score in await db.execute(stmt)]
+
+
+def search_query(dialect_name: str, q: str, limit: int, after: Optional[Tuple[float, int]] = None) -> Optional[Select]:
+    # None when the text has no searchable term
+    if dialect_name == "postgresql":
+        query = _tsquery(q)
+        score = func.ts_rank_cd(Job.search_vector, query)
+        stmt = select(Job, score.label("score")).where(Job.search_vector.op("@@")(query))
+    else:
+        match = _fts5_query(q)
+        if match is None:
+            return None
+        score = -func.bm25(literal_column("jobs_fts"), *[literal_column(weight) for weight in FTS5_WEIGHTS])
+        stmt = (
+            select(Job, score.label("score"))
+            .join(jobs_fts, jobs_fts.c.rowid == Job.id)
+            .where(literal_column("jobs_fts").op("MATCH")(match))
+        )
+
+    if after is not None:
+        stmt = stmt.where(tuple_(score, Job.id) < tuple_(*after))
+    return stmt.order_by(score.desc(), Job.id.desc()).limit(limit)
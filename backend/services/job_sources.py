@@ -0,0 +1,197 @@
+import asyncio
+import importlib
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Protocol, Set
+
+import httpx
+
+from auth.schemas import JobBase
+from core.config import settings
+from services import http_client
+from utils.colorText import colorText
+
+
+class SourcePolicy:
+    """
+    Limites d'une source : débit (requêtes/s), requêtes simultanées, timeout par requête,
+    budget de temps de l'import complet et seuils du disjoncteur.
+    """
+    def __init__(
+        self,
+        rate_limit: float,
+        concurrency: int = 1,
+        request_timeout: float = settings.HTTP_TIMEOUT,
+        time_budget: float = settings.SOURCE_TIME_BUDGET,
+        breaker_failures: int = settings.CIRCUIT_BREAKER_FAILURES,
+        breaker_reset_seconds: float = settings.CIRCUIT_BREAKER_RESET_SECONDS,
+    ):
+        self.rate_limit = rate_limit
+        self.concurrency = concurrency
+        self.request_timeout = request_timeout
+        self.time_budget = time_budget
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_seconds = breaker_reset_seconds
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class SourceTimeoutError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Ouvert après `failures` échecs consécutifs : les appels échouent aussitôt pendant `reset_seconds`,
+    puis le premier appel qui passe referme le circuit (ou le rouvre s'il échoue).
+    """
+    def __init__(self, name: str, failures: int, reset_seconds: float):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_seconds
+
+    def check(self) -> None:
+        if self.is_open:
+            retry_in = self.reset_seconds - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError(f"{self.name}: circuit ouvert, nouvel essai dans {retry_in:.0f}s.")
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        # past the reset delay (half-open) a single failure is enough to open it again
+        if self.consecutive_failures >= self.failures or self.opened_at is not None:
+            if not self.is_open:
+                print(colorText(f"{self.name}: circuit ouvert pour {self.reset_seconds:.0f}s.", 'rouge'))
+            self.opened_at = time.monotonic()
+
+
+class SourceClient:
+    """
+    Accès HTTP d'une source : applique son débit, sa concurrence et son timeout, et alimente son disjoncteur
+    (erreurs réseau, 429 et 5xx seulement).
+    """
+    def __init__(self, name: str, policy: SourcePolicy):
+        self.rate_limiter = http_client.RateLimiter(policy.rate_limit)
+        self.semaphore = asyncio.Semaphore(policy.concurrency)
+        self.timeout = httpx.Timeout(policy.request_timeout, connect=settings.HTTP_CONNECT_TIMEOUT)
+        self.breaker = CircuitBreaker(name, policy.breaker_failures, policy.breaker_reset_seconds)
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self.breaker.check()
+        async with self.semaphore:
+            try:
+                response = await http_client.request(method, url, rate_limiter=self.rate_limiter, timeout=self.timeout, **kwargs)
+            except httpx.HTTPError as e:
+                if is_upstream_failure(e):
+                    self.breaker.record_failure()
+                raise
+        self.breaker.record_success()
+        return response
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        self.breaker.check()
+        async with self.semaphore:
+            try:
+                async with http_client.stream(method, url, rate_limiter=self.rate_limiter, timeout=self.timeout, **kwargs) as response:
+                    self.breaker.record_success()
+                    yield response
+            except httpx.HTTPError as e:
+                if is_upstream_failure(e):
+                    self.breaker.record_failure()
+                raise
+
+
+def is_upstream_failure(error: httpx.HTTPError) -> bool:
+    # the source is down or overloaded; a 4xx (bad query, expired token...) is our request's fault
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class JobSource(Protocol):
+    """
+    Une source d'offres. `iter_jobs` renvoie les offres brutes par lots, `to_job` en convertit une en JobBase.
+    Avec SKIP_KNOWN_IDS, la source reçoit les external_id déjà en base pour ne pas les relire.
+    """
+    SOURCE: str
+    POLICY: SourcePolicy
+    SKIP_KNOWN_IDS: bool
+
+    @staticmethod
+    def is_enabled() -> bool: ...
+
+    @staticmethod
+    def iter_jobs(client: SourceClient, since: Optional[datetime], known_ids: Set[str]) -> AsyncIterator[List[dict]]: ...
+
+    @staticmethod
+    def to_job(offer: dict) -> JobBase: ...
+
+
+class RegisteredSource:
+    def __init__(self, source: JobSource):
+        self.source = source
+        self.name = source.SOURCE
+        self.policy = source.POLICY
+        # one client per process: the breaker remembers the failures of the previous imports
+        self.client = SourceClient(source.SOURCE, source.POLICY)
+
+    async def iter_jobs(self, since: Optional[datetime], known_ids: Set[str]) -> AsyncIterator[List[dict]]:
+        """
+        Lots de la source, coupés au bout de son budget de temps (SourceTimeoutError) :
+        les lots déjà reçus sont enregistrés, la source est marquée en échec.
+        """
+        fetcher = self.source.iter_jobs(self.client, since, known_ids)
+        deadline = asyncio.get_running_loop().time() + self.policy.time_budget
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        batch = await fetcher.__anext__()
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    self.client.breaker.record_failure()
+                    raise SourceTimeoutError(f"{self.name}: budget de {self.policy.time_budget:.0f}s dépassé.")
+                yield batch
+        finally:
+            await fetcher.aclose()
+
+
+_registry: Dict[str, RegisteredSource] = {}
+
+
+def register(source: JobSource) -> JobSource:
+    """
+    Décorateur de classe : ajoute la source au registre.
+    """
+    _registry[source.SOURCE] = RegisteredSource(source)
+    return source
+
+
+def load_sources() -> Dict[str, RegisteredSource]:
+    # importing a module of JOB_SOURCE_MODULES registers its sources
+    for module in settings.JOB_SOURCE_MODULES:
+        importlib.import_module(module)
+    return _registry
+
+
+def get_source(name: str) -> RegisteredSource:
+    return load_sources()[name]
+
+
+def enabled_sources() -> List[str]:
+    return [name for name, entry in load_sources().items() if entry.source.is_enabled()]
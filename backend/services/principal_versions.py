@@ -0,0 +1,105 @@
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+
+from core.config import settings
+from utils.colorText import colorText
+
+
+class MemoryPrincipalVersions:
+    """
+    Versions des utilisateurs dans la mémoire du process : un seul worker (dev, tests).
+    """
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+
+    async def get(self, username: str) -> int:
+        return self._versions.get(username, 0)
+
+    async def bump(self, usernames: Iterable[str]) -> None:
+        for username in usernames:
+            self._versions[username] = self._versions.get(username, 0) + 1
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisPrincipalVersions:
+    """
+    Versions partagées entre les workers : un compteur par nom d'utilisateur, sans TTL (une version qui
+    disparaîtrait puis repartirait de zéro pourrait retrouver celle d'un principal périmé encore en cache).
+    """
+    def __init__(self, url: str, prefix: str = "nextoffer:principals:"):
+        # optional dependency, only needed with PRINCIPAL_CACHE_BACKEND=redis
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, username: str) -> int:
+        return int(await self.client.get(self.prefix + username) or 0)
+
+    async def bump(self, usernames: Iterable[str]) -> None:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for username in usernames:
+                pipe.incr(self.prefix + username)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_backend = None
+# bumps scheduled by a commit, awaited on shutdown
+_pending: Set[asyncio.Task] = set()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.PRINCIPAL_CACHE_BACKEND == "redis":
+            _backend = RedisPrincipalVersions(settings.REDIS_URL)
+        else:
+            _backend = MemoryPrincipalVersions()
+    return _backend
+
+
+async def get_version(username: str) -> Optional[int]:
+    """
+    Version courante de l'utilisateur, None si elle ne peut pas être lue (le principal est alors relu en base).
+    """
+    try:
+        return await get_backend().get(username)
+    except Exception as e:
+        print(colorText(f"Error reading the principal version of {username}: {e}", 'rouge'))
+        return None
+
+
+async def bump(usernames: Set[str]) -> None:
+    """
+    Périme les principaux en cache de ces utilisateurs dans tous les workers (à appeler après le commit).
+    """
+    try:
+        await get_backend().bump(usernames)
+    except Exception as e:
+        print(colorText(f"Error bumping the principal versions of {', '.join(sorted(usernames))}: {e}", 'rouge'))
+
+
+def bump_soon(usernames: Set[str]) -> None:
+    # from a sync SQLAlchemy event, on the event loop of the committing session
+    task = asyncio.get_running_loop().create_task(bump(usernames))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def wait_bumps() -> None:
+    # the bumps scheduled by the commits so far
+    if _pending:
+        await asyncio.gather(*_pending)
+
+
+async def close_principal_versions() -> None:
+    global _backend
+    await wait_bumps()
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
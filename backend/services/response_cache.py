@@ -0,0 +1,179 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from core.config import settings
+from utils.colorText import colorText
+
+# the browser revalidates with If-None-Match on every use, the ETag turns it into a 304
+CACHE_CONTROL = "no-cache"
+
+
+class MemoryCacheBackend:
+    """
+    Cache en mémoire du process, LRU borné par un budget en octets.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.generation = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes) -> None:
+        entry_size = len(key) + len(value)
+        if entry_size > self.max_bytes:
+            return
+        if key in self._entries:
+            self.size -= len(key) + len(self._entries.pop(key))
+        self._entries[key] = value
+        self.size += entry_size
+        while self.size > self.max_bytes:
+            old_key, old_value = self._entries.popitem(last=False)
+            self.size -= len(old_key) + len(old_value)
+
+    async def get_generation(self) -> int:
+        return self.generation
+
+    async def bump_generation(self) -> int:
+        # entries of the previous generations can't be reached anymore, free them now
+        self.generation += 1
+        self._entries.clear()
+        self.size = 0
+        return self.generation
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisCacheBackend:
+    """
+    Cache partagé entre les workers (Redis ou compatible). La mémoire est bornée côté serveur avec maxmemory et
+    volatile-lru : seules les clés avec un TTL (les réponses) sont évincées. La génération, les vues en attente
+    d'écriture et les versions des utilisateurs n'ont pas de TTL et ne doivent jamais être perdues.
+    """
+    def __init__(self, url: str, ttl: int, prefix: str = "nextoffer:responses:"):
+        # optional dependency, only needed with RESPONSE_CACHE_BACKEND=redis
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        # entries of old generations are never read again, the TTL cleans them up
+        await self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    async def get_generation(self) -> int:
+        return int(await self.client.get(self.prefix + "generation") or 0)
+
+    async def bump_generation(self) -> int:
+        return await self.client.incr(self.prefix + "generation")
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.RESPONSE_CACHE_BACKEND == "redis":
+            _backend = RedisCacheBackend(settings.REDIS_URL, settings.RESPONSE_CACHE_TTL)
+        else:
+            _backend = MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_BYTES)
+    return _backend
+
+
+async def close_response_cache() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+async def bump_generation() -> None:
+    """
+    Invalide toutes les réponses en cache (à appeler après un commit qui modifie les offres).
+    """
+    try:
+        generation = await get_backend().bump_generation()
+        print(colorText(f"Response cache generation {generation}.", 'bleu'))
+    except Exception as e:
+        print(colorText(f"Error bumping the response cache generation: {e}", 'rouge'))
+
+
+def cache_key(name: str, params: Dict[str, Any]) -> str:
+    # normalised: same parameters in any order give the same key
+    return name + ":" + json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def _to_json(payload: Union[BaseModel, Dict[str, Any]]) -> bytes:
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json().encode()
+    return orjson.dumps(payload)
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    return any(candidate == "*" or candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+async def cached_json_response(
+    request: Request,
+    key: str,
+    build: Callable[[], Awaitable[Union[BaseModel, Dict[str, Any]]]],
+) -> Response:
+    """
+    Renvoie le JSON en cache pour `key`, sinon appelle `build` et met le résultat sérialisé en cache.
+    `build` renvoie un modèle pydantic, ou un dict encodé directement par orjson (datetimes compris).
+    Répond 304 quand If-None-Match correspond à l'ETag.
+    """
+    backend = get_backend()
+    entry = None
+    try:
+        key = f"{await backend.get_generation()}:{key}"
+        entry = await backend.get(key)
+    except Exception as e:
+        # the cache is an optimisation, never a reason to fail the request
+        print(colorText(f"Response cache unavailable: {e}", 'rouge'))
+        key = None
+
+    if entry is not None:
+        etag, body = entry.split(b"\n", 1)
+        etag = etag.decode()
+    else:
+        body = _to_json(await build())
+        etag = _etag(body)
+        if key is not None:
+            try:
+                await backend.set(key, etag.encode() + b"\n" + body)
+            except Exception as e:
+                print(colorText(f"Response cache unavailable: {e}", 'rouge'))
+
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
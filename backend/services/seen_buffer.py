@@ -0,0 +1,287 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Select, select, update
+
+from core.config import settings
+from database import AsyncSessionLocal, dialect_insert
+from models.models import Job, SeenJob, User
+from utils.colorText import colorText
+
+SeenKey = Tuple[int, int] # (user_id, job_id)
+
+
+class MemorySeenBackend:
+    """
+    Vues en attente dans la mémoire du process : un seul worker (dev, tests).
+    """
+    def __init__(self):
+        # in the order they were seen; a pair is kept once
+        self._pending: Dict[SeenKey, None] = {}
+
+    async def add(self, user_id: int, job_id: int) -> bool:
+        key = (user_id, job_id)
+        if key in self._pending:
+            return False
+        self._pending[key] = None
+        return True
+
+    async def is_pending(self, user_id: int, job_id: int) -> bool:
+        return (user_id, job_id) in self._pending
+
+    async def pending_job_ids(self, user_id: int) -> List[int]:
+        return [job_id for pending_user_id, job_id in reversed(self._pending) if pending_user_id == user_id]
+
+    async def claim(self, limit: int) -> List[SeenKey]:
+        # left in place: the overlay shows them until they are written
+        return list(self._pending)[:limit]
+
+    async def release(self, keys: List[SeenKey]) -> None:
+        pass
+
+    async def remove(self, keys: List[SeenKey]) -> None:
+        for key in keys:
+            self._pending.pop(key, None)
+
+    async def close(self) -> None:
+        pass
+
+
+class RedisSeenBackend:
+    """
+    Vues en attente partagées entre les workers : un sorted set par utilisateur (job_id, score = instant de la vue)
+    et l'ensemble des utilisateurs à écrire. Un flush déplace des utilisateurs de cet ensemble vers celui des
+    utilisateurs pris (SMOVE : deux workers ne prennent jamais le même), qu'ils ne quittent qu'une fois leurs vues
+    écrites. Ceux d'un worker arrêté en route sont repris après `claim_timeout` secondes. Les vues restent lisibles
+    jusqu'à leur écriture.
+    """
+    def __init__(self, url: str, claim_timeout: float, prefix: str = "nextoffer:seen:"):
+        # optional dependency, only needed with SEEN_BUFFER_BACKEND=redis
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.claim_timeout = claim_timeout
+        self.prefix = prefix
+        self.users_key = prefix + "users"
+        # users taken by a flush, and when (a hash: user_id -> timestamp)
+        self.claimed_key = prefix + "claimed"
+        self.claimed_at_key = prefix + "claimed_at"
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def add(self, user_id: int, job_id: int) -> bool:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._key(user_id), {job_id: time.time()}, nx=True)
+            pipe.sadd(self.users_key, user_id)
+            added, _ = await pipe.execute()
+        return bool(added)
+
+    async def is_pending(self, user_id: int, job_id: int) -> bool:
+        return await self.client.zscore(self._key(user_id), job_id) is not None
+
+    async def pending_job_ids(self, user_id: int) -> List[int]:
+        return [int(job_id) for job_id in await self.client.zrevrange(self._key(user_id), 0, -1)]
+
+    async def claim(self, limit: int) -> List[SeenKey]:
+        await self._recover_claims()
+        keys: List[SeenKey] = []
+        while len(keys) < limit:
+            user_id = await self.client.srandmember(self.users_key)
+            if user_id is None:
+                break
+            if not await self.client.smove(self.users_key, self.claimed_key, user_id):
+                # taken by another worker meanwhile
+                continue
+            await self.client.hset(self.claimed_at_key, user_id, time.time())
+            user_id = int(user_id)
+            # the oldest views first, at most `limit` in all: the others wait for the next claim
+            job_ids = await self.client.zrange(self._key(user_id), 0, limit - len(keys) - 1)
+            if not job_ids:
+                await self._unclaim({user_id})
+            keys.extend((user_id, int(job_id)) for job_id in job_ids)
+        return keys
+
+    async def _recover_claims(self) -> None:
+        # users claimed by a worker stopped before their views were written: back in the set to write
+        cutoff = time.time() - self.claim_timeout
+        claimed_at = await self.client.hgetall(self.claimed_at_key)
+        for user_id in await self.client.smembers(self.claimed_key):
+            at = claimed_at.get(user_id)
+            if at is None:
+                # being claimed right now, or by a worker stopped before it recorded the time: timed from now
+                await self.client.hsetnx(self.claimed_at_key, user_id, time.time())
+            elif float(at) < cutoff and await self.client.smove(self.claimed_key, self.users_key, user_id):
+                await self.client.hdel(self.claimed_at_key, user_id)
+                print(colorText(f"Seen jobs of user {int(user_id)} claimed by a stopped worker, claimed again.", 'jaune'))
+
+    async def _unclaim(self, users: Set[int]) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.srem(self.claimed_key, *users)
+            pipe.hdel(self.claimed_at_key, *users)
+            await pipe.execute()
+
+    async def release(self, keys: List[SeenKey]) -> None:
+        # not written: the next flush (of any worker) takes these users again
+        users = {user_id for user_id, _ in keys}
+        if users:
+            # back in the set before leaving the claimed ones: never in neither
+            await self.client.sadd(self.users_key, *users)
+            await self._unclaim(users)
+
+    async def remove(self, keys: List[SeenKey]) -> None:
+        by_user: Dict[int, List[int]] = {}
+        for user_id, job_id in keys:
+            by_user.setdefault(user_id, []).append(job_id)
+        for user_id, job_ids in by_user.items():
+            await self.client.zrem(self._key(user_id), *job_ids)
+            # seen again while being written, or left by a claim capped at its limit: back in the set for the next flush
+            if await self.client.zcard(self._key(user_id)):
+                await self.client.sadd(self.users_key, user_id)
+        if by_user:
+            await self._unclaim(set(by_user))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_backend = None
+_added_since_flush = 0
+_flush_task: Optional[asyncio.Task] = None
+_flush_lock: Optional[asyncio.Lock] = None
+_flush_needed: Optional[asyncio.Event] = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.SEEN_BUFFER_BACKEND == "redis":
+            _backend = RedisSeenBackend(settings.REDIS_URL, settings.SEEN_BUFFER_CLAIM_TIMEOUT)
+        else:
+            _backend = MemorySeenBackend()
+    return _backend
+
+
+async def add(user_id: int, job_id: int) -> bool:
+    """
+    Met la vue en attente d'écriture. Renvoie False si elle l'était déjà.
+    """
+    global _added_since_flush
+    if not await get_backend().add(user_id, job_id):
+        return False
+    _added_since_flush += 1
+    if _added_since_flush >= settings.SEEN_BUFFER_MAX_EVENTS and _flush_needed is not None:
+        _flush_needed.set()
+    return True
+
+
+async def is_pending(user_id: int, job_id: int) -> bool:
+    return await get_backend().is_pending(user_id, job_id)
+
+
+async def pending_job_ids(user_id: int) -> List[int]:
+    # most recent first, like the seen jobs read from the base
+    return await get_backend().pending_job_ids(user_id)
+
+
+async def flush() -> int:
+    """
+    Ecrit toutes les vues en attente, par lots de SEEN_BUFFER_MAX_EVENTS : un INSERT ... ON CONFLICT DO NOTHING
+    et une transaction par lot, qui passe aussi à la version suivante l'état des utilisateurs concernés.
+    Renvoie le nombre de vues ajoutées.
+    """
+    global _added_since_flush
+    backend = get_backend()
+    total = 0
+    async with _get_flush_lock():
+        _added_since_flush = 0
+        while True:
+            keys = await backend.claim(settings.SEEN_BUFFER_MAX_EVENTS)
+            if not keys:
+                return total
+            try:
+                total += await _write(keys)
+            except Exception:
+                await backend.release(keys)
+                raise
+            # removed only once written: until then the overlay shows them
+            await backend.remove(keys)
+
+
+async def _write(keys: List[SeenKey]) -> int:
+    async with AsyncSessionLocal() as db:
+        # a job or a user deleted since the view would fail the foreign keys of the whole batch, every time
+        jobs = set(await db.scalars(existing_ids_query(Job, {job_id for _, job_id in keys})))
+        users = set(await db.scalars(existing_ids_query(User, {user_id for user_id, _ in keys})))
+        rows = [{"user_id": user_id, "job_id": job_id} for user_id, job_id in keys if job_id in jobs and user_id in users]
+        # one returned row per view inserted, none for those already in the base
+        inserted: List[int] = []
+        if rows:
+            inserted = list((await db.execute(
+                dialect_insert(db, SeenJob.__table__)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["user_id", "job_id"])
+                .returning(SeenJob.user_id)
+            )).scalars())
+        if inserted:
+            await db.execute(
+                update(User).where(User.id.in_(set(inserted))).values(state_version=User.state_version + 1)
+            )
+        await db.commit()
+        return len(inserted)
+
+
+def existing_ids_query(model, ids: Set[int]) -> Select:
+    return select(model.id).where(model.id.in_(ids))
+
+
+def start_seen_buffer() -> None:
+    global _flush_task, _flush_needed
+    _flush_needed = asyncio.Event()
+    _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def close_seen_buffer() -> None:
+    """
+    Arrête l'écriture périodique et écrit ce qui reste en attente.
+    """
+    global _backend, _flush_task, _flush_needed
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+    _flush_needed = None
+    if _backend is not None:
+        try:
+            count = await flush()
+            if count:
+                print(colorText(f"{count} seen job(s) written on shutdown.", 'vert_fonce'))
+        finally:
+            await _backend.close()
+            _backend = None
+
+
+async def _flush_loop() -> None:
+    # every SEEN_BUFFER_FLUSH_SECONDS, or earlier when SEEN_BUFFER_MAX_EVENTS views were added by this process
+    while True:
+        try:
+            await asyncio.wait_for(_flush_needed.wait(), timeout=settings.SEEN_BUFFER_FLUSH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _flush_needed.clear()
+        try:
+            await flush()
+        except Exception as e:
+            # the views stay in the buffer, the next flush retries them
+            print(colorText(f"Seen jobs flush failed: {e}", 'rouge'))
+
+
+def _get_flush_lock() -> asyncio.Lock:
+    global _flush_lock
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+    return _flush_lock
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import select, update
+
+from models.models import User
+from routers import auth as auth_router
+from services import principal_versions
+
+
+def test_token_is_accepted(client, login):
+    user_id, headers = login()
+
+    response = client.get("/api/auth/users/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["id"] == user_id
+
+
+def test_password_reset_revokes_issued_tokens(client, in_db, login, monkeypatch):
+    monkeypatch.setattr(auth_router, "send_simple_message", lambda *args: None)
+    _, headers = login()
+    assert client.get("/api/auth/users/me", headers=headers).status_code == 200
+
+    client.post("/api/auth/forgot-password", json={"email": "alice@example.com"})
+
+    async def reset_token(db):
+        return await db.scalar(select(User.reset_password_token).where(User.username == "alice"))
+    client.post("/api/auth/reset-password", json={"token": in_db(reset_token), "new_password": "changed"})
+
+    # the principal of the old token was cached by the first request
+    assert client.get("/api/auth/users/me", headers=headers).status_code == 401
+    token = client.post("/api/auth/token", data={"username": "alice", "password": "changed"}).json()
+    assert client.get("/api/auth/users/me", headers={"Authorization": f"Bearer {token['access_token']}"}).status_code == 200
+
+
+@pytest.fixture
+def shared_versions(client, monkeypatch):
+    # two workers reading the same redis: this process, and `other` which commits the change
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+
+    def worker_versions():
+        versions = principal_versions.RedisPrincipalVersions("redis://localhost")
+        versions.client = fakeredis.FakeAsyncRedis(server=server)
+        return versions
+    monkeypatch.setattr(principal_versions, "_backend", worker_versions())
+    return worker_versions()
+
+
+def revoke_in_other_worker(sync_engine, username: str) -> None:
+    # a plain UPDATE: none of this process' ORM events see it
+    with sync_engine.begin() as connection:
+        connection.execute(update(User).where(User.username == username).values(token_version=User.token_version + 1))
+
+
+def test_revocation_in_another_worker_needs_the_shared_version(client, login, sync_engine, shared_versions):
+    _, headers = login()
+    assert client.get("/api/auth/users/me", headers=headers).status_code == 200
+
+    revoke_in_other_worker(sync_engine, "alice")
+
+    # without the version bump the cached principal is still used
+    assert client.get("/api/auth/users/me", headers=headers).status_code == 200
+
+    client.portal.call(shared_versions.bump, {"alice"})
+
+    assert client.get("/api/auth/users/me", headers=headers).status_code == 401
+
+
+def test_commit_bumps_the_shared_version(client, in_db, login, shared_versions):
+    login()
+    before = client.portal.call(shared_versions.get, "alice")
+
+    async def disable(db):
+        user = await db.scalar(select(User).where(User.username == "alice"))
+        user.disabled = True
+        await db.commit()
+        await principal_versions.wait_bumps()
+    in_db(disable)
+
+    assert client.portal.call(shared_versions.get, "alice") == before + 1
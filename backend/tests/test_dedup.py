@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import select
+
+from auth.schemas import ImportStats
+from models.models import Job, JobAlias
+from services.job_aggregator import JobAggregator
+
+from conftest import make_job
+
+COMPANY = (
+    "Acme est une entreprise de logiciels basée à Paris qui compte deux cents salariés et développe des outils de "
+    "gestion pour les PME. Nous offrons des tickets restaurant, une mutuelle prise en charge à cent pour cent et deux "
+    "jours de télétravail par semaine. Le processus de recrutement comprend un entretien avec les ressources "
+    "humaines, un exercice technique et une rencontre avec l'équipe."
+)
+PAYMENTS = COMPANY + " Vous rejoindrez l'équipe paiement pour développer la facturation."
+# same company text, another team: 9 bits of SimHash apart
+DATA = COMPANY + " Vous rejoindrez l'équipe données pour construire les pipelines."
+# the same offer, published again with a retouched sentence: 3 bits apart
+PAYMENTS_RETOUCHED = PAYMENTS.replace("développer la facturation", "développer toute la facturation")
+
+
+def posting(index: int, description: str, **fields):
+    # same title, company and location: the same exact key for every posting
+    return make_job(index, title="Développeur Python (H/F)", description=description, **fields)
+
+
+def ingest(in_db, *batches) -> ImportStats:
+    async def run(db):
+        stats = ImportStats()
+        for jobs in batches:
+            await JobAggregator.ingest_jobs(jobs, db, stats)
+        return stats
+    return in_db(run)
+
+
+def rows(in_db, model):
+    async def run(db):
+        return list(await db.scalars(select(model)))
+    return in_db(run)
+
+
+@pytest.mark.parametrize("batches", ["one batch", "two batches"])
+def test_republished_offer_from_another_source_is_merged(in_db, batches):
+    original = posting(0, PAYMENTS, source="France Travail", url="")
+    republished = posting(1, PAYMENTS_RETOUCHED, source="Remotive", url="https://remotive.example.com/1")
+
+    stats = ingest(in_db, [original, republished]) if batches == "one batch" else ingest(in_db, [original], [republished])
+
+    assert (stats.inserted, stats.merged) == (1, 1)
+    (job,) = rows(in_db, Job)
+    (alias,) = rows(in_db, JobAlias)
+    assert (alias.external_id, alias.job_id, alias.source) == (republished.external_id, job.id, "Remotive")
+    # the canonical offer takes the url it lacked from its duplicate
+    assert (job.external_id, job.url) == (original.external_id, republished.url)
+
+
+def test_merged_offer_is_skipped_by_the_next_imports(in_db):
+    ingest(in_db, [posting(0, PAYMENTS), posting(1, PAYMENTS_RETOUCHED)])
+
+    stats = ingest(in_db, [posting(1, PAYMENTS_RETOUCHED)])
+
+    assert (stats.inserted, stats.updated, stats.merged, stats.skipped) == (0, 0, 0, 1)
+    assert len(rows(in_db, Job)) == 1
+
+
+@pytest.mark.parametrize("batches", ["one batch", "two batches"])
+def test_different_postings_sharing_a_key_are_kept(in_db, batches):
+    payments, data = posting(0, PAYMENTS), posting(1, DATA)
+
+    stats = ingest(in_db, [payments, data]) if batches == "one batch" else ingest(in_db, [payments], [data])
+
+    assert (stats.inserted, stats.merged) == (2, 0)
+    assert sorted(job.external_id for job in rows(in_db, Job)) == [payments.external_id, data.external_id]
+    assert rows(in_db, JobAlias) == []
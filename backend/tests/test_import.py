@@ -0,0 +1,103 @@
+import asyncio
+import time
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import func, select
+
+from auth.schemas import SourceProgress
+from models.models import Job
+from services import job_sources
+from services.import_pipeline import ImportPipeline
+from services.job_aggregator import JobAggregator
+from services.job_sources import RegisteredSource, SourcePolicy
+
+from conftest import make_job
+
+BATCHES = [[{"index": 0}, {"index": 1}], [{"index": 2}, {"index": 3}]]
+
+
+class FakeSource:
+    SOURCE = "Test"
+    POLICY = SourcePolicy(rate_limit=100)
+    SKIP_KNOWN_IDS = False
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return True
+
+    @staticmethod
+    async def iter_jobs(client, since, known_ids):
+        for batch in BATCHES:
+            yield batch
+
+    @staticmethod
+    def to_job(offer: dict):
+        return make_job(offer["index"], source="Test")
+
+
+@pytest.fixture
+def fake_source(monkeypatch):
+    monkeypatch.setitem(job_sources.load_sources(), FakeSource.SOURCE, RegisteredSource(FakeSource))
+    return FakeSource.SOURCE
+
+
+def count_jobs(in_db) -> int:
+    async def run(db):
+        return await db.scalar(select(func.count()).select_from(Job))
+    return in_db(run)
+
+
+def test_failing_progress_save_does_not_stop_the_import(in_db, fake_source):
+    progress: Dict[str, SourceProgress] = {}
+    calls: List[int] = []
+
+    async def on_progress():
+        calls.append(1)
+        raise RuntimeError("database is locked")
+
+    async def run(db):
+        return await JobAggregator.aggregate_jobs(db, [fake_source], progress, on_progress=on_progress)
+    stats = in_db(run)
+
+    # one call per written batch and one at the end of the source
+    assert len(calls) == 3
+    assert stats.inserted == 4
+    assert progress[fake_source].status == "succeeded"
+    assert count_jobs(in_db) == 4
+
+
+def test_failing_source_done_does_not_stop_the_pipeline(client):
+    written: List[int] = []
+
+    async def write(source, jobs, db):
+        written.append(len(jobs))
+
+    async def on_source_done(source):
+        raise RuntimeError("database is locked")
+
+    async def fetch(batches):
+        for batch in batches:
+            yield batch
+
+    pipeline = ImportPipeline(lambda source, offers: [make_job(offer["index"]) for offer in offers], write, on_source_done)
+    # a stage killed by the callback would leave its queue unfinished: fail instead of waiting forever
+    client.portal.call(asyncio.wait_for, pipeline.run({"A": fetch(BATCHES), "B": fetch(BATCHES[:1])}), 10)
+
+    assert sorted(written) == [2, 2, 2]
+    assert pipeline.failed == set()
+
+
+def test_import_run_saves_its_progress(client, in_db, fake_source):
+    started = client.post("/api/jobs/import", params={"source": fake_source}).json()
+
+    for _ in range(100):
+        run = client.get(f"/api/jobs/import/{started['run_id']}").json()
+        if run["status"] not in ("pending", "running"):
+            break
+        time.sleep(0.05)
+
+    assert run["status"] == "succeeded"
+    assert run["sources"][fake_source]["status"] == "succeeded"
+    assert run["stats"]["inserted"] == 4
+    assert count_jobs(in_db) == 4
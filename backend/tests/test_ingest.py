@@ -0,0 +1,56 @@
+from sqlalchemy import func, select
+
+from auth.schemas import ImportStats
+from models.models import Job
+from services.job_aggregator import JobAggregator
+
+from conftest import make_job
+
+
+def ingest(in_db, jobs) -> ImportStats:
+    async def run(db):
+        return await JobAggregator.ingest_jobs(jobs, db)
+    return in_db(run)
+
+
+def count_jobs(in_db) -> int:
+    async def run(db):
+        return await db.scalar(select(func.count()).select_from(Job))
+    return in_db(run)
+
+
+def test_ingest_inserts_new_jobs(in_db):
+    stats = ingest(in_db, [make_job(i) for i in range(5)])
+
+    assert (stats.fetched, stats.inserted, stats.updated, stats.skipped, stats.failed) == (5, 5, 0, 0, 0)
+    assert count_jobs(in_db) == 5
+
+
+def test_ingest_same_batch_twice_writes_nothing(in_db):
+    jobs = [make_job(i) for i in range(5)]
+    ingest(in_db, jobs)
+
+    stats = ingest(in_db, jobs)
+
+    # unchanged rows are skipped by the WHERE of the ON CONFLICT DO UPDATE
+    assert (stats.inserted, stats.updated, stats.skipped) == (0, 0, 5)
+    assert count_jobs(in_db) == 5
+
+
+def test_ingest_updates_changed_job_only(in_db):
+    ingest(in_db, [make_job(i) for i in range(3)])
+
+    stats = ingest(in_db, [make_job(0), make_job(1, salary="45k€"), make_job(2)])
+
+    assert (stats.inserted, stats.updated, stats.skipped) == (0, 1, 2)
+
+    async def salary(db):
+        return await db.scalar(select(Job.salary).where(Job.external_id == "job-1"))
+    assert in_db(salary) == "45k€"
+
+
+def test_ingest_skips_duplicates_of_the_batch(in_db):
+    stats = ingest(in_db, [make_job(0), make_job(0), make_job(1, url=make_job(0).url)])
+
+    assert (stats.inserted, stats.skipped) == (1, 2)
+    assert count_jobs(in_db) == 1
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from conftest import make_job
+
+
+def walk(client, limit: int, **params):
+    # every page of GET /api/jobs/, following next_cursor
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, limit=limit, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/jobs/", params=query)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pagination_walks_every_job_once(client, add_jobs):
+    # several offers share each date: the id breaks the ties
+    ids = add_jobs([make_job(i, dateCreation=datetime(2025, 1, 1 + i % 3)) for i in range(11)])
+
+    pages = walk(client, limit=4)
+
+    assert [len(page) for page in pages] == [4, 4, 3]
+    expected = sorted(ids, key=lambda job_id: ((ids.index(job_id) % 3), job_id), reverse=True)
+    assert [job_id for page in pages for job_id in page] == expected
+
+
+def test_keyset_pagination_last_page_has_no_cursor(client, add_jobs):
+    add_jobs([make_job(i) for i in range(3)])
+
+    page = client.get("/api/jobs/", params={"limit": 3}).json()
+
+    assert len(page["items"]) == 3
+    assert page["next_cursor"] is None
+
+
+def test_keyset_pagination_keeps_the_filters(client, add_jobs):
+    lyon = add_jobs([make_job(i, location="Lyon 3e" if i % 2 else "Paris") for i in range(7)])[1::2]
+
+    pages = walk(client, limit=2, location="lyon")
+
+    assert sorted(job_id for page in pages for job_id in page) == sorted(lyon)
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/jobs/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
@@ -0,0 +1,73 @@
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from migrations import baseline
+from models.models import Base
+
+from conftest import alembic_config
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # on SQLite, the FTS5 table (and its shadow tables) of the search takes the place of the tsvector column's index
+    return not (type_ == "table" and name.startswith("jobs_fts"))
+
+
+def schema_differences(connection):
+    context = MigrationContext.configure(connection, opts={"include_object": include_object})
+    differences = compare_metadata(context, Base.metadata)
+    if connection.dialect.name == "sqlite":
+        # the GIN index of the search vector is only created on PostgreSQL
+        differences = [diff for diff in differences if not (diff[0] == "add_index" and diff[1].name == "ix_jobs_search_vector")]
+    return differences
+
+
+def head_revision(url) -> str:
+    return ScriptDirectory.from_config(alembic_config(url)).get_current_head()
+
+
+def test_migrated_schema_matches_the_models(sync_engine):
+    with sync_engine.connect() as connection:
+        assert schema_differences(connection) == []
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar_one() == head_revision(sync_engine.url)
+
+
+def test_database_from_before_the_migrations_is_upgraded(tmp_path):
+    # created by create_all before the migrations existed: baseline tables, data, no alembic version
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        baseline.metadata.create_all(connection)
+        connection.execute(text("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'alice', 'alice@example.com', 'x')"))
+        connection.execute(text(
+            "INSERT INTO jobs (id, external_id, title, url, source, \"dateCreation\") "
+            "VALUES (1, 'job-1', 'Développeur Python', 'https://jobs.example.com/1', 'Remotive', '2025-01-01 00:00:00')"
+        ))
+        # the same like twice: the unique (user_id, job_id) of the migrations keeps one
+        connection.execute(text("INSERT INTO liked_jobs (user_id, job_id) VALUES (1, 1), (1, 1)"))
+
+    command.upgrade(alembic_config(engine.url), "head")
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalar_one() == head_revision(engine.url)
+        assert connection.execute(text("SELECT count(*) FROM liked_jobs")).scalar_one() == 1
+        assert connection.execute(text("SELECT token_version, state_version, disabled FROM users")).one() == (0, 0, 0)
+        assert connection.execute(text("SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH 'python'")).scalars().all() == [1]
+        assert schema_differences(connection) == []
+    engine.dispose()
+
+
+def test_migrations_go_down_to_the_baseline_and_up_again(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'round_trip.db'}")
+    config = alembic_config(engine.url)
+    command.upgrade(config, "head")
+
+    command.downgrade(config, baseline.BASELINE_REVISION)
+    with engine.connect() as connection:
+        assert "token_version" not in {column["name"] for column in inspect(connection).get_columns("users")}
+
+    command.upgrade(config, "head")
+    with engine.connect() as connection:
+        assert schema_differences(connection) == []
+    engine.dispose()
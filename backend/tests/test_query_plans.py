@@ -0,0 +1,211 @@
+"""
+EXPLAIN des requêtes des routes sur la base migrée : chacune doit passer par l'index prévu pour elle,
+sans lire une table en entier ni trier quand ce n'est pas attendu. Sur SQLite par défaut, sur PostgreSQL
+avec TEST_DATABASE_URL (voir conftest.py) : les deux tournent en CI.
+"""
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Set, Tuple, Union
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from core.config import settings
+from models.models import AppliedJob, Job, JobAlias, LikedJob, SeenJob, User
+from routers.auth import activity_query
+from routers.jobs import existing_jobs_query, see_job_query, seen_job_ids_query, user_jobs_query
+from services import job_recommender, job_search
+from services.job_aggregator import JobAggregator
+from services.seen_buffer import existing_ids_query
+
+DIALECT = make_url(settings.DATABASE_URL).get_backend_name()
+
+# "SCAN jobs" reads the whole table, "SCAN jobs USING INDEX ..." walks an index in order (stopped by LIMIT)
+SQLITE_FULL_SCAN = re.compile(r"^SCAN \w+( AS \w+)?$")
+# index read by a step of a SQLite plan: named index, rowid (primary key) or FTS5 table
+SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)|USING (INTEGER PRIMARY KEY)|^SCAN (\w+) VIRTUAL TABLE")
+# the cases name the PostgreSQL indexes; the same index under SQLite's name
+SQLITE_INDEX_NAMES = {
+    "jobs_pkey": "INTEGER PRIMARY KEY",
+    "users_pkey": "INTEGER PRIMARY KEY",
+    "jobs_external_id_key": "sqlite_autoindex_jobs_1",
+    "job_simhash_bands_pkey": "sqlite_autoindex_job_simhash_bands_1",
+    "uq_seen_jobs_user_id_job_id": "sqlite_autoindex_seen_jobs_1",
+    "uq_applied_jobs_user_id_job_id": "sqlite_autoindex_applied_jobs_1",
+    "uq_liked_jobs_user_id_job_id": "sqlite_autoindex_liked_jobs_1",
+    "ix_jobs_search_vector": "jobs_fts",
+}
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN " if compiler.dialect.name == "sqlite" else "EXPLAIN (FORMAT JSON) "
+    sql = prefix + compiler.process(element.statement, **kw)
+    # the rows are the plan: not read with the types of the statement's columns (a bytea would decode the JSON)
+    compiler._result_columns = []
+    return sql
+
+
+# an index the plan must read, or a tuple of indexes serving the query equally well (any one of them)
+ExpectedIndex = Union[str, Tuple[str, ...]]
+
+
+class Case(NamedTuple):
+    name: str
+    statement: Any
+    # indexes the plan must read, all of them
+    indexes: Tuple[ExpectedIndex, ...] = ()
+    # a full export reads every row, a relevance ranking sorts its matches: both are expected
+    allow_full_scan: bool = False
+    allow_sort: bool = False
+
+
+def cases(dialect_name: str) -> List[Case]:
+    after = (datetime(2025, 1, 1), 1000)
+    by_date = ("ix_jobs_date_creation_id",)
+    # the anti joins of the feed probe (user_id, job_id) or (user_id, id): both start with the user
+    feed = by_date + (
+        ("uq_seen_jobs_user_id_job_id", "ix_seen_jobs_user_id_id"),
+        ("uq_applied_jobs_user_id_job_id", "ix_applied_jobs_user_id_id"),
+    )
+    # users.id has both the primary key and the index of the baseline schema
+    user_by_id = ("users_pkey", "ix_users_id")
+    search = [
+        Case(name, statement, ("ix_jobs_search_vector",), allow_sort=True)
+        for name, statement in (
+            ("search", job_search.search_query(dialect_name, "développeur python", 20)),
+            ("search next page", job_search.search_query(dialect_name, "développeur python", 20, (0.5, 1000))),
+        )
+    ]
+    links = [
+        case
+        for model in (LikedJob, SeenJob, AppliedJob)
+        for case in (
+            Case(f"{model.__tablename__} of a user", user_jobs_query(model, 1, 0, 50), (f"ix_{model.__tablename__}_user_id_id", "jobs_pkey")),
+            Case(f"{model.__tablename__} activity", activity_query(model, 1, 51), (f"ix_{model.__tablename__}_user_id_id", "jobs_pkey")),
+            Case(
+                f"{model.__tablename__} activity next page",
+                activity_query(model, 1, 51, 1000),
+                (f"ix_{model.__tablename__}_user_id_id", "jobs_pkey"),
+            ),
+        )
+    ]
+    return [
+        Case("jobs page", JobAggregator.jobs_page_query(20), by_date),
+        Case("jobs next page", JobAggregator.jobs_page_query(20, after), by_date),
+        Case("jobs by source", JobAggregator.jobs_page_query(20, after, source="France Travail"), ("ix_jobs_source_date_creation_id",)),
+        Case("jobs by contract", JobAggregator.jobs_page_query(20, after, typeContrat="CDI"), ("ix_jobs_type_contrat_date_creation_id",)),
+        # the matches of a location are sorted by date, not read in date order
+        Case("jobs by location", JobAggregator.jobs_page_query(20, location="paris"), ("ix_jobs_location_lower",), allow_sort=True),
+        Case("jobs since a date", JobAggregator.jobs_page_query(20, date_from=datetime(2025, 1, 1)), by_date),
+        Case("feed", JobAggregator.feed_page_query(1, 20), feed),
+        Case("feed next page", JobAggregator.feed_page_query(1, 20, after, exclude_ids=[1, 2]), feed),
+        Case("job by id", select(Job).where(Job.id == 1), ("jobs_pkey",)),
+        Case("export", JobAggregator.export_query(), allow_full_scan=True),
+        Case("export by source", JobAggregator.export_query(source="Remotive"), ("ix_jobs_source_date_creation_id",), allow_sort=True),
+        *search,
+        *links,
+        Case("see job: job, view and state version", see_job_query(1, 1), ("jobs_pkey", "uq_seen_jobs_user_id_job_id", user_by_id)),
+        Case("interactions batch: existing jobs", existing_jobs_query({1, 2, 3}), ("jobs_pkey",)),
+        Case("interactions batch: jobs already seen", seen_job_ids_query(1, [1, 2, 3]), ("uq_seen_jobs_user_id_job_id",)),
+        Case("seen buffer flush: existing jobs", existing_ids_query(Job, {1, 2, 3}), ("jobs_pkey",)),
+        Case("seen buffer flush: existing users", existing_ids_query(User, {1, 2, 3}), (user_by_id,)),
+        Case("user by username", select(User).where(User.username == "alice"), ("ix_users_username",)),
+        Case("user by email", select(User).where(User.email == "alice@example.com"), ("ix_users_email",)),
+        Case("user state version", select(User.state_version).where(User.id == 1), (user_by_id,)),
+        Case(
+            "profile: vectors of the liked jobs",
+            job_recommender.liked_vectors_query(1),
+            (("uq_liked_jobs_user_id_job_id", "ix_liked_jobs_user_id_id"), "jobs_pkey"),
+        ),
+        Case(
+            "import: known ids of a source",
+            select(Job.external_id).where(Job.source == "Remotive"),
+            ("ix_jobs_source_date_creation_id",),
+        ),
+        Case(
+            "import: merged ids of a source",
+            select(JobAlias.external_id).where(JobAlias.source == "Remotive"),
+            ("ix_job_aliases_source",),
+        ),
+        Case(
+            "import: existing ids and urls",
+            select(Job.external_id, Job.url).where(Job.external_id.in_(["a", "b"]) | Job.url.in_(["https://a", "https://b"])),
+            ("jobs_external_id_key", "ix_jobs_url"),
+        ),
+        Case(
+            "import: duplicate candidates",
+            JobAggregator.duplicate_candidates_query({"key-a", "key-b"}, {1, 2, 3}),
+            ("ix_jobs_fingerprint", "job_simhash_bands_pkey", "jobs_pkey"),
+        ),
+    ]
+
+
+def missing_indexes(case: Case, used: Set[str], names: Dict[str, str]) -> List[str]:
+    problems = []
+    for expected in case.indexes:
+        alternatives = (expected,) if isinstance(expected, str) else expected
+        if not any(names.get(name, name) in used for name in alternatives):
+            problems.append(f"{' or '.join(alternatives)} not used")
+    return problems
+
+
+def sqlite_problems(rows: List[Any], case: Case) -> List[str]:
+    problems = []
+    used: Set[str] = set()
+    for row in rows:
+        detail = row[-1]
+        if not case.allow_full_scan and SQLITE_FULL_SCAN.match(detail):
+            problems.append(detail)
+        if not case.allow_sort and "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+        used.update(name for match in SQLITE_INDEX.findall(detail) for name in match if name)
+    return problems + missing_indexes(case, used, SQLITE_INDEX_NAMES)
+
+
+def postgres_problems(plan: Dict[str, Any], case: Case) -> List[str]:
+    used: Set[str] = set()
+    problems = _postgres_node_problems(plan, case, used)
+    return problems + missing_indexes(case, used, {})
+
+
+def _postgres_node_problems(plan: Dict[str, Any], case: Case, used: Set[str]) -> List[str]:
+    problems = []
+    node_type = plan["Node Type"]
+    if node_type == "Seq Scan" and not case.allow_full_scan:
+        problems.append(f"Seq Scan on {plan.get('Relation Name')}")
+    if node_type in ("Sort", "Incremental Sort") and not case.allow_sort:
+        problems.append(f"{node_type} on {', '.join(plan.get('Sort Key', []))}")
+    if "Index Name" in plan:
+        used.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        problems.extend(_postgres_node_problems(child, case, used))
+    return problems
+
+
+@pytest.mark.parametrize("case", cases(DIALECT), ids=lambda case: case.name)
+def test_query_reads_its_index(sync_engine, case):
+    with sync_engine.connect() as connection:
+        if DIALECT == "postgresql":
+            # with seq scans priced out, one left in the plan means no index can serve the query;
+            # sorts too unless expected: an index read in order must not win over the expected one
+            connection.execute(text("SET enable_seqscan = off"))
+            connection.execute(text(f"SET enable_sort = {'on' if case.allow_sort else 'off'}"))
+            document = connection.execute(Explain(case.statement)).scalar_one()
+            plan = (json.loads(document) if isinstance(document, str) else document)[0]["Plan"]
+            problems = postgres_problems(plan, case)
+        else:
+            problems = sqlite_problems(connection.execute(Explain(case.statement)).all(), case)
+
+    assert problems == []
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from models.models import SeenJob
+from services import seen_buffer
+
+from conftest import make_job
+
+
+def redis_backend(server, claim_timeout: float = 60) -> seen_buffer.RedisSeenBackend:
+    # a worker of its own on the shared fake redis
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = seen_buffer.RedisSeenBackend("redis://localhost", claim_timeout)
+    backend.client = fakeredis.FakeAsyncRedis(server=server)
+    return backend
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, client, monkeypatch):
+    if request.param == "memory":
+        backend = seen_buffer.MemorySeenBackend()
+    else:
+        backend = redis_backend(pytest.importorskip("fakeredis").FakeServer())
+    monkeypatch.setattr(seen_buffer, "_backend", backend)
+    return backend
+
+
+def stored_views(in_db, user_id: int):
+    async def run(db):
+        return list(await db.scalars(select(SeenJob.job_id).where(SeenJob.user_id == user_id)))
+    return in_db(run)
+
+
+def see(client, headers, user_id: int, job_id: int):
+    return client.post(f"/api/jobs/{user_id}/seen-jobs", params={"compact": "true"}, json={"job_id": job_id}, headers=headers)
+
+
+def test_pending_views_are_listed_before_the_flush(client, in_db, add_jobs, login, backend):
+    seen_id, other_id = add_jobs([make_job(0), make_job(1)])
+    user_id, headers = login()
+
+    assert see(client, headers, user_id, seen_id).status_code == 200
+    assert see(client, headers, user_id, seen_id).status_code == 409
+
+    assert stored_views(in_db, user_id) == []
+    assert [job["id"] for job in client.get(f"/api/jobs/seen-jobs/{user_id}").json()] == [seen_id]
+    assert [job["id"] for job in client.get("/api/jobs/feed", headers=headers).json()["items"]] == [other_id]
+
+    assert client.portal.call(seen_buffer.flush) == 1
+
+    assert stored_views(in_db, user_id) == [seen_id]
+    assert [job["id"] for job in client.get(f"/api/jobs/seen-jobs/{user_id}").json()] == [seen_id]
+    assert [job["id"] for job in client.get("/api/jobs/feed", headers=headers).json()["items"]] == [other_id]
+
+
+def test_flush_counts_the_views_it_inserted(client, add_jobs, login, backend):
+    (job_id,) = add_jobs([make_job(0)])
+    user_id, headers = login()
+    # written at once, then buffered again as by a request that read the base before that write
+    client.post(f"/api/jobs/{user_id}/seen-jobs", json={"job_id": job_id}, headers=headers)
+    client.portal.call(backend.add, user_id, job_id)
+
+    assert client.portal.call(seen_buffer.flush) == 0
+    assert client.portal.call(backend.pending_job_ids, user_id) == []
+
+
+def test_views_claimed_by_a_stopped_worker_are_written_by_another():
+    server = pytest.importorskip("fakeredis").FakeServer()
+
+    async def run():
+        stopped = redis_backend(server)
+        await stopped.add(1, 10)
+        await stopped.add(1, 11)
+        # claimed, then the worker stops before writing them
+        assert sorted(await stopped.claim(500)) == [(1, 10), (1, 11)]
+
+        # still pending for the readers, not claimed again before the timeout
+        assert await redis_backend(server).claim(500) == []
+        assert sorted(await redis_backend(server).pending_job_ids(1)) == [10, 11]
+
+        other = redis_backend(server, claim_timeout=0)
+        keys = await other.claim(500)
+        assert sorted(keys) == [(1, 10), (1, 11)]
+        await other.remove(keys)
+        assert await other.pending_job_ids(1) == []
+        assert await other.claim(500) == []
+    asyncio.run(run())
+
+
+def test_claim_takes_at_most_its_limit():
+    server = pytest.importorskip("fakeredis").FakeServer()
+
+    async def run():
+        backend = redis_backend(server)
+        for job_id in range(5):
+            await backend.add(1, job_id)
+        await backend.add(2, 10)
+
+        first = await backend.claim(3)
+        assert len(first) == 3
+        await backend.remove(first)
+
+        # the views left by the capped claim are taken by the next one
+        rest = await backend.claim(500)
+        assert sorted(first + rest) == [(1, 0), (1, 1), (1, 2), (1, 3), (1, 4), (2, 10)]
+        await backend.remove(rest)
+        assert await backend.claim(500) == []
+    asyncio.run(run())
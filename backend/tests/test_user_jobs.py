@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from models.models import Job, User
+from services import job_recommender
+
+from conftest import make_job
+
+MISSING_JOB_ID = 10 ** 9
+
+ADD_ROUTES = {
+    "liked": "/api/jobs/liked-jobs",
+    "applied": "/api/jobs/{user_id}/apply-jobs",
+}
+
+
+@pytest.mark.parametrize("kind", ADD_ROUTES)
+def test_add_user_job_then_duplicate(client, add_jobs, login, kind):
+    (job_id,) = add_jobs([make_job(0)])
+    user_id, headers = login()
+    url = ADD_ROUTES[kind].format(user_id=user_id)
+
+    first = client.post(url, params={"compact": "true"}, json={"job_id": job_id}, headers=headers)
+    again = client.post(url, params={"compact": "true"}, json={"job_id": job_id}, headers=headers)
+
+    assert first.status_code == 200
+    assert first.json() == {"user_id": user_id, "job_id": job_id, "kind": kind, "action": "added", "version": 1}
+    assert again.status_code == 409
+    # the refused duplicate leaves the state version as it was
+    assert client.get("/api/auth/users/me/activity", params={"kind": kind}, headers=headers).json()["version"] == 1
+
+
+@pytest.mark.parametrize("kind", ADD_ROUTES)
+def test_add_user_job_missing_job(client, login, kind):
+    user_id, headers = login()
+
+    response = client.post(ADD_ROUTES[kind].format(user_id=user_id), json={"job_id": MISSING_JOB_ID}, headers=headers)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Job not found"
+
+
+@pytest.mark.parametrize("kind", ADD_ROUTES)
+def test_add_user_job_requires_a_token(client, add_jobs, kind):
+    (job_id,) = add_jobs([make_job(0)])
+
+    response = client.post(ADD_ROUTES[kind].format(user_id=1), json={"job_id": job_id})
+
+    assert response.status_code == 401
+
+
+def test_activity_lists_jobs_without_title(client, in_db, login):
+    async def add_untitled_job(db):
+        job = Job(external_id="untitled", url="https://jobs.example.com/untitled", source="France Travail",
+                  dateCreation=datetime(2025, 1, 1))
+        db.add(job)
+        await db.commit()
+        return job.id
+    job_id = in_db(add_untitled_job)
+    _, headers = login()
+    client.post("/api/jobs/liked-jobs", params={"compact": "true"}, json={"job_id": job_id}, headers=headers)
+
+    response = client.get("/api/auth/users/me/activity", params={"kind": "liked"}, headers=headers)
+
+    assert response.status_code == 200
+    assert [item["job"] for item in response.json()["items"]] == [{"id": job_id, "title": None, "company": None}]
+
+
+def unlike(client, job_id: int, headers=None):
+    return client.delete(f"/api/jobs/liked-jobs/{job_id}", params={"compact": "true"}, headers=headers)
+
+
+def test_unlike_removes_the_like_of_the_token_user(client, add_jobs, login):
+    (job_id,) = add_jobs([make_job(0)])
+    alice_id, alice = login("alice")
+    _, bob = login("bob")
+    client.post("/api/jobs/liked-jobs", json={"job_id": job_id}, headers=alice)
+
+    assert unlike(client, job_id).status_code == 401
+    # another user's token only reaches its own likes
+    assert unlike(client, job_id, bob).status_code == 404
+
+    response = unlike(client, job_id, alice)
+
+    assert response.status_code == 200
+    assert response.json() == {"user_id": alice_id, "job_id": job_id, "kind": "liked", "action": "removed", "version": 2}
+    assert unlike(client, job_id, alice).status_code == 404
+
+
+def test_profile_is_the_sum_of_the_current_likes(client, in_db, add_jobs, login):
+    # close offers: their vectors share words
+    job_ids = add_jobs([
+        make_job(0, title="Développeur Python 0", description="<p>Développement backend Python, API REST et PostgreSQL</p>"),
+        make_job(1, title="Développeur Python 1", description="<p>Développement backend Python, Django et Redis</p>"),
+        make_job(2, title="Développeur Python 2", description="<p>Développement Python, data et PostgreSQL</p>"),
+    ])
+    user_id, headers = login()
+    for job_id in job_ids:
+        client.post("/api/jobs/liked-jobs", json={"job_id": job_id}, headers=headers)
+    # subtracting the float32 vectors from the sum would not give back the last one exactly
+    for job_id in job_ids[:2]:
+        assert unlike(client, job_id, headers).status_code == 200
+
+    async def vectors(db):
+        profile = await db.scalar(select(User.profile_vector).where(User.id == user_id))
+        kept = await db.scalar(select(Job.vector).where(Job.id == job_ids[2]))
+        return job_recommender.from_bytes(profile), job_recommender.from_bytes(kept)
+    profile, kept = in_db(vectors)
+
+    assert kept.any()
+    assert np.array_equal(profile, kept)
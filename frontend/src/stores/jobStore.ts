@@ -11,12 +11,18 @@ const { toast } = useToast()
 
 const API_URL = import.meta.env.VITE_API_URL
 
+// seen events are grouped: one POST /api/jobs/interactions:batch every few seconds instead of one per card
+const SEEN_BATCH_SIZE = 50
+const SEEN_FLUSH_DELAY_MS = 2000
+const pendingSeenJobIds: number[] = []
+let seenFlushTimer: ReturnType<typeof setTimeout> | null = null
+
 export const useJobStore = defineStore('jobStore', {
   state: () => ({
     jobs: [] as Job[],
     isLoading: false,
     hasMore: true,
-    offset: 0,
+    nextCursor: null as string | null,
     limit: 20,
     searchQuery: '',
     searchResults: 0,
@@ -72,10 +78,12 @@ export const useJobStore = defineStore('jobStore', {
         })
       }
     },
-    async fetchJobs(offset: number = 0, limit: number = 20) {
+    async fetchJobs(cursor: string | null = null, limit: number = 20) {
       this.isLoading = true
       try {
-        const res = await fetch(`${API_URL}/api/jobs/?offset=${offset}&limit=${limit}`)
+        const params = new URLSearchParams({ limit: String(limit) })
+        if (cursor) params.set('cursor', cursor)
+        const res = await fetch(`${API_URL}/api/jobs/?${params}`)
 
         if (!res.ok) {
           const errorText = await res.text()
@@ -83,18 +91,19 @@ export const useJobStore = defineStore('jobStore', {
           return
         }
 
-        const data: Job[] = await res.json()
+        const data: { items: Job[]; next_cursor: string | null } = await res.json()
 
-        const jobsWithInitialStatus = data.map((job) => ({
+        const jobsWithInitialStatus = data.items.map((job) => ({
           ...job,
           liked: false,
           seen: false,
           applicationSent: false,
         }))
 
-        this.jobs = offset === 0 ? jobsWithInitialStatus : [...this.jobs, ...jobsWithInitialStatus]
+        this.jobs = cursor === null ? jobsWithInitialStatus : [...this.jobs, ...jobsWithInitialStatus]
 
-        if (data.length < limit) this.hasMore = false
+        this.nextCursor = data.next_cursor
+        this.hasMore = data.next_cursor !== null
       } catch (error) {
         console.error('Failed to fetch jobs:', error)
       } finally {
@@ -153,6 +162,24 @@ export const useJobStore = defineStore('jobStore', {
         return null
       }
     },
+    async fetchJobDescription(id: number): Promise<string | null> {
+      // the list only carries the start of long descriptions
+      try {
+        const res = await fetch(`${API_URL}/api/jobs/${id}`)
+        if (!res.ok) return null
+
+        const data: Job = await res.json()
+        const job = this.getJobById(id)
+        if (job) {
+          job.description = data.description
+          job.description_truncated = false
+        }
+        return data.description ?? null
+      } catch (error) {
+        console.error('Failed to fetch job description:', error)
+        return null
+      }
+    },
     async likeJob(jobId: number) {
       const job = this.jobs.find((j) => j.id === jobId)
       if (!job) return false
@@ -177,7 +204,7 @@ export const useJobStore = defineStore('jobStore', {
           return false
         }
 
-        const response = await fetch(`${API_URL}/api/jobs/liked-jobs`, {
+        const response = await fetch(`${API_URL}/api/jobs/liked-jobs?compact=true`, {
           method: 'POST',
           headers: {
             Authorization: `Bearer ${token}`,
@@ -217,16 +244,15 @@ export const useJobStore = defineStore('jobStore', {
 
       try {
         const authStore = useAuthStore()
-        const userId = authStore.currentUser?.id
         const token = authStore.token
 
-        if (!userId || !token) {
-          console.error('User ID or auth token is missing for unlike action.')
+        if (!token) {
+          console.error('Auth token missing to unlike')
           job.liked = originalLikedStatus
           return false
         }
 
-        const response = await fetch(`${API_URL}/api/jobs/liked-jobs/${jobId}?user_id=${userId}`, {
+        const response = await fetch(`${API_URL}/api/jobs/liked-jobs/${jobId}?compact=true`, {
           method: 'DELETE',
           headers: {
             Authorization: `Bearer ${token}`,
@@ -275,48 +301,59 @@ export const useJobStore = defineStore('jobStore', {
       const index = this.jobs.findIndex((job) => job.id === updatedJob.id)
       if (index !== -1) Object.assign(this.jobs[index], updatedJob)
     },
-    async seeJob(jobId: number) {
+    seeJob(jobId: number) {
       const job = this.jobs.find((j) => j.id === jobId)
       if (!job) return false
       if (job.seen) {
         console.log(`Job ${jobId} is already seen locally.`)
         return true
       }
+      if (!useAuthStore().token) {
+        console.error('auht token missing to see the job')
+        return false
+      }
 
-      const originalSeenStatus = job.seen
+      // marked seen right away, sent with the next batch of interactions
       job.seen = true
+      pendingSeenJobIds.push(jobId)
+      if (pendingSeenJobIds.length >= SEEN_BATCH_SIZE) {
+        void this.flushSeenJobs()
+      } else if (seenFlushTimer === null) {
+        seenFlushTimer = setTimeout(() => void this.flushSeenJobs(), SEEN_FLUSH_DELAY_MS)
+      }
+      return true
+    },
+    async flushSeenJobs(keepalive = false) {
+      if (seenFlushTimer !== null) {
+        clearTimeout(seenFlushTimer)
+        seenFlushTimer = null
+      }
+      const jobIds = pendingSeenJobIds.splice(0)
+      if (!jobIds.length) return true
 
       try {
-        const authStore = useAuthStore()
-        const token = authStore.token
-        if (!token) {
-          console.error('auht token missing to see the job')
-          job.seen = originalSeenStatus
-          return false
-        }
-        const response = await fetch(`${API_URL}/api/jobs/${authStore.currentUser?.id}/seen-jobs`, {
+        const response = await fetch(`${API_URL}/api/jobs/interactions:batch`, {
           method: 'POST',
           headers: {
-            Authorization: `Bearer ${token}`,
+            Authorization: `Bearer ${useAuthStore().token}`,
             'Content-Type': 'application/json',
           },
-          body: JSON.stringify({ job_id: jobId }),
+          body: JSON.stringify(jobIds.map((jobId) => ({ job_id: jobId, kind: 'seen' }))),
+          // lets the last batch finish when the page is closed
+          keepalive,
         })
-
         if (!response.ok) {
-          if (response.status === 409) {
-            console.warn(`Job ${jobId} already seen on the server`)
-          } else {
-            const errorText = await response.text()
-            throw new Error(`Fail on action see job: ${response.status} - ${errorText}`)
-          }
+          const errorText = await response.text()
+          throw new Error(`Fail on action see jobs: ${response.status} - ${errorText}`)
         }
-        console.log(`Job ${jobId} seen successfully.`)
+        console.log(`${jobIds.length} job(s) seen successfully.`)
         return true
       } catch (error) {
-        console.error('Failed to see job:', error)
+        console.error('Failed to see jobs:', error)
         showNetworkErrorToast()
-        job.seen = originalSeenStatus
+        this.jobs.forEach((job) => {
+          if (jobIds.includes(job.id)) job.seen = false
+        })
         return false
       }
     },
@@ -356,7 +393,7 @@ export const useJobStore = defineStore('jobStore', {
           return false
         }
         const response = await fetch(
-          `${API_URL}/api/jobs/${authStore.currentUser?.id}/apply-jobs`,
+          `${API_URL}/api/jobs/${authStore.currentUser?.id}/apply-jobs?compact=true`,
           {
             method: 'POST',
             headers: {
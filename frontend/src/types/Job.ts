@@ -9,6 +9,7 @@ export interface Job {
   applicationSent?: boolean
   salary?: string
   description?: string
+  description_truncated?: boolean
   typeContrat?: string
   dateCreation?: Date
 }